@@ -0,0 +1,357 @@
+# Nicolas Moy
+# DSCI 551 Semester Project
+# Benchmarks for Project.py on synthetic player.csv / WarriorsStats.csv shaped data
+#
+#   python Benchmark.py --rows 10k 1m              # writes bench_results/<commit>.tsv
+#   python Benchmark.py --compare old.tsv new.tsv  # flags slowdowns between two runs
+#
+# Generated CSVs are kept in bench_data/ and reused by later runs with the same settings.
+
+import argparse
+import gc
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import Project
+from Project import Column, dataFrame, load_csv, col, iter_join
+
+
+PLAYER_ID_BASE = 100000
+POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+FIRST_NAMES = ['Stephen', 'Klay', 'Draymond', 'Andrew', 'Jordan', 'Kevon', 'Jonathan', 'Moses',
+               'Gary', 'Anthony', 'Donte', 'JaMychal', 'Ty', 'Patrick', 'Lester', 'Andre']
+LAST_NAMES = ['Curry', 'Thompson', 'Green', 'Wiggins', 'Poole', 'Looney', 'Kuminga', 'Moody',
+              'Payton', 'Lamb', 'DiVincenzo', 'Jerome', 'Baldwin', 'Quinones', 'Iguodala', 'Smith']
+
+PLAYER_COLUMNS = ['id', 'full_name', 'first_name', 'last_name', 'is_active']
+WARRIORS_COLUMNS = ['player_id', 'full_name', 'position', 'games_played', 'minutes_per_game',
+                    'points_per_game', 'rebounds_per_game', 'assists_per_game', 'steals_per_game',
+                    'blocks_per_game', 'field_goal_pct', 'three_point_pct', 'free_throw_pct',
+                    'turnovers_per_game', 'fouls_per_game', 'age', 'salary']
+
+RESULT_FIELDS = ['operation', 'rows', 'seconds', 'peak_bytes', 'result_rows']
+
+# Rows generated (and written) at a time
+GENERATE_CHUNK_ROWS = 100000
+
+
+#////////////////////////  Data generator  /////////////////////////////////////
+# Both generators return {column: list of values} for one chunk of rows drawn
+# from rng. Key columns are never null; every other cell is None with
+# probability null_rate.
+def _with_nulls(values, rng, null_rate):
+    if null_rate <= 0:
+        return values
+    return [None if rng.random() < null_rate else value for value in values]
+
+
+def player_columns(rows, rng, null_rate = 0.0, first_id = PLAYER_ID_BASE):
+    first = [rng.choice(FIRST_NAMES) for _ in range(rows)]
+    last = [rng.choice(LAST_NAMES) for _ in range(rows)]
+    return {
+        'id': list(range(first_id, first_id + rows)),
+        'full_name': _with_nulls([f"{a} {b}" for a, b in zip(first, last)], rng, null_rate),
+        'first_name': _with_nulls(first, rng, null_rate),
+        'last_name': _with_nulls(last, rng, null_rate),
+        'is_active': _with_nulls([rng.randrange(2) for _ in range(rows)], rng, null_rate),
+    }
+
+
+# player_id takes key_cardinality distinct values, all of them ids from
+# player_columns (so every row joins when key_cardinality <= player rows)
+def warriors_columns(rows, rng, null_rate = 0.0, key_cardinality = 1000):
+    names = [f"{a} {b}" for a in FIRST_NAMES for b in LAST_NAMES]
+
+    def floats(low, high, digits = 1):
+        return _with_nulls([round(rng.uniform(low, high), digits) for _ in range(rows)], rng, null_rate)
+
+    def ints(low, high):
+        return _with_nulls([rng.randint(low, high) for _ in range(rows)], rng, null_rate)
+
+    return {
+        'player_id': [PLAYER_ID_BASE + rng.randrange(key_cardinality) for _ in range(rows)],
+        'full_name': _with_nulls([rng.choice(names) for _ in range(rows)], rng, null_rate),
+        'position': _with_nulls([rng.choice(POSITIONS) for _ in range(rows)], rng, null_rate),
+        'games_played': ints(1, 82),
+        'minutes_per_game': floats(0, 40),
+        'points_per_game': floats(0, 35),
+        'rebounds_per_game': floats(0, 15),
+        'assists_per_game': floats(0, 12),
+        'steals_per_game': floats(0, 3),
+        'blocks_per_game': floats(0, 3),
+        'field_goal_pct': floats(30, 70),
+        'three_point_pct': floats(0, 50),
+        'free_throw_pct': floats(40, 100),
+        'turnovers_per_game': floats(0, 5),
+        'fouls_per_game': floats(0, 5),
+        'age': ints(19, 40),
+        'salary': ints(1000000, 50000000),
+    }
+
+
+# Nulls are written as empty fields, which load_csv reads back as '' (only
+# the missing fields of a short row load as None)
+def write_rows(file, names, columns):
+    for row in zip(*(columns[name] for name in names)):
+        file.write(",".join("" if value is None else str(value) for value in row) + "\n")
+
+
+# Builds a table chunk by chunk from generate(first_row, rows), writing each
+# chunk to path (unless it is None) and keeping it as typed Columns that are
+# stitched together at the end, so no full-length lists are held at once
+def generate_table(generate, rows, names, path = None, chunk_rows = GENERATE_CHUNK_ROWS):
+    chunks = {name: [] for name in names}
+    file = None
+    if path is not None:
+        # Written under a temporary name so an interrupted run leaves no partial file
+        file = open(path + '.tmp', 'w', buffering = 1 << 20)
+        file.write(",".join(names) + "\n")
+    try:
+        for start in range(0, rows, chunk_rows):
+            columns = generate(start, min(chunk_rows, rows - start))
+            if file is not None:
+                write_rows(file, names, columns)
+            for name in names:
+                chunks[name].append(Column.from_values(columns[name]))
+    finally:
+        if file is not None:
+            file.close()
+    if file is not None:
+        os.replace(path + '.tmp', path)
+    return dataFrame({name: Column.concat(chunks[name]) for name in names}, list(names))
+
+
+#////////////////////////  Benchmark setup  /////////////////////////////////////
+# "10k" -> 10000, "1m" -> 1000000
+def parse_rows(text):
+    multipliers = {'k': 1000, 'm': 1000000}
+    text = text.strip().lower()
+    if text[-1:] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+# Generated data for one table size. The in-memory frames are built straight
+# from the generated values (real None nulls), so the operation timings don't
+# depend on how the parser reads empty fields; the CSV files are only used to
+# time loading. Missing CSV files are written while generating.
+class BenchData:
+    def __init__(self, rows, data_dir, seed, null_rate, key_cardinality, player_rows):
+        self.rows = rows
+        tag = f"{rows}_s{seed}_n{null_rate}_k{key_cardinality}"
+        self.player_csv = os.path.join(data_dir, f"players_{player_rows}_s{seed}_n{null_rate}.csv")
+        self.warriors_csv = os.path.join(data_dir, f"warriors_{tag}.csv")
+
+        player_rng = random.Random(seed)
+        self.players = generate_table(
+            lambda start, count: player_columns(count, player_rng, null_rate, PLAYER_ID_BASE + start),
+            player_rows, PLAYER_COLUMNS, None if os.path.exists(self.player_csv) else self.player_csv)
+
+        warriors_rng = random.Random(seed + 1)
+        self.warriors = generate_table(
+            lambda start, count: warriors_columns(count, warriors_rng, null_rate, key_cardinality),
+            rows, WARRIORS_COLUMNS, None if os.path.exists(self.warriors_csv) else self.warriors_csv)
+
+
+# (name, function of BenchData). Each returns what the operation produced,
+# which is only used for the result_rows column.
+OPERATIONS = [
+    ('load_csv warriors', lambda b: load_csv(b.warriors_csv)),
+    ('load_csv players', lambda b: load_csv(b.player_csv)),
+    ('where expression', lambda b: b.warriors.where((col('points_per_game') > 20) & (col('age') < 30))),
+    ('where dict', lambda b: b.warriors.where({'position': 'PG'})),
+    ('group_by position', lambda b: b.warriors.group_by('position')),
+    ('group_by player_id', lambda b: b.warriors.group_by('player_id')),
+    ('sum salary by position', lambda b: b.warriors.sum('position', 'salary')),
+    ('agg by player_id', lambda b: b.warriors.agg('player_id', {'points_per_game': ['avg', 'max'], '*': ['count']})),
+    ('agg by player_id spilling', lambda b: b.warriors.agg('player_id', {'points_per_game': ['avg', 'max'], '*': ['count']},
+                                                       memory_budget = 1024 * 1024)),
+    ('agg by player_id parallel', lambda b: b.warriors.agg('player_id', {'points_per_game': ['avg', 'max'], '*': ['count']},
+                                                       workers = max(2, os.cpu_count() or 1))),
+    ('approx_avg salary by position', lambda b: b.warriors.approx_avg('position', 'salary', seed = 0)),
+    ('approx distinct player_id', lambda b: b.warriors.approx_count_distinct('player_id')),
+    ('join warriors players', lambda b: b.warriors.join(b.players, 'player_id', 'id')),
+    ('grace join warriors players', lambda b: sum(f.shape[0] for f in iter_join(b.warriors_csv, b.player_csv,
+                                                                                'player_id', 'id', chunk_rows = 10000))),
+    ('grace join bloom filter', lambda b: sum(f.shape[0] for f in iter_join(b.warriors_csv, b.player_csv, 'player_id', 'id',
+                                                                            chunk_rows = 10000, bloom_filter = True))),
+    ('semi_join warriors players', lambda b: b.warriors.semi_join(b.players, 'player_id', 'id')),
+    ('order_by top 10', lambda b: b.warriors.order_by(['position', 'points_per_game'], [True, False], limit = 10)),
+    ('order_by all', lambda b: b.warriors.order_by(['position', 'points_per_game'], [True, False])),
+]
+
+
+def _result_rows(result):
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dataFrame):
+        return result.shape[0]
+    if isinstance(result, tuple):
+        data, names = result
+        return len(data[names[0]]) if names else 0
+    return len(result)
+
+
+#////////////////////////  Measuring  /////////////////////////////////////
+# Best wall time over repeat runs, then one more run under tracemalloc for the
+# peak memory the operation allocated (timed separately, tracemalloc slows it)
+def measure(function, bench, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function(bench)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = function(bench)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, _result_rows(result)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True,
+                              check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes, repeat, data_dir, seed, null_rate, key_cardinality, player_rows, only = None):
+    os.makedirs(data_dir, exist_ok = True)
+    # Repeated runs must do the work every time
+    Project.RESULT_CACHE.max_bytes = 0
+    Project.RESULT_CACHE.clear()
+
+    results = []
+    for rows in sizes:
+        print(f"Generating {rows} rows ...", file = sys.stderr)
+        bench = BenchData(rows, data_dir, seed, null_rate, key_cardinality, player_rows or rows)
+        for name, function in OPERATIONS:
+            if only and not any(word in name for word in only):
+                continue
+            seconds, peak, result_rows = measure(function, bench, repeat)
+            results.append({'operation': name, 'rows': rows, 'seconds': seconds,
+                            'peak_bytes': peak, 'result_rows': result_rows})
+            print(f"{name:<28} {rows:>10} rows  {seconds:10.4f} s  {peak / 2**20:10.1f} MB", file = sys.stderr)
+        del bench
+    return results
+
+
+#////////////////////////  Results files  /////////////////////////////////////
+# Tab separated: '# key: value' metadata lines, a header line, then one line per
+# (operation, rows). Easy to diff and to read back without extra libraries.
+def write_results(path, results, metadata):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+    with open(path, 'w') as file:
+        for key, value in metadata.items():
+            file.write(f"# {key}: {value}\n")
+        file.write("\t".join(RESULT_FIELDS) + "\n")
+        for result in results:
+            file.write("\t".join(str(result[field]) for field in RESULT_FIELDS) + "\n")
+
+
+def read_results(path):
+    metadata, results, header = {}, [], None
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith("# "):
+                key, _, value = line[2:].partition(": ")
+                metadata[key] = value
+            elif header is None:
+                header = line.split("\t")
+            else:
+                row = dict(zip(header, line.split("\t")))
+                results.append({'operation': row['operation'], 'rows': int(row['rows']),
+                                'seconds': float(row['seconds']), 'peak_bytes': int(row['peak_bytes']),
+                                'result_rows': int(row['result_rows'])})
+    return metadata, results
+
+
+# Prints old vs new for every (operation, rows) in both files. Returns the
+# number of regressions: slower (or using more memory) by more than threshold.
+# Timings under min_seconds in both runs are too noisy to flag.
+def compare(old_path, new_path, threshold = 0.10, min_seconds = 0.01):
+    old_meta, old_results = read_results(old_path)
+    new_meta, new_results = read_results(new_path)
+    old = {(r['operation'], r['rows']): r for r in old_results}
+
+    print(f"old: {old_meta.get('commit', old_path)}   new: {new_meta.get('commit', new_path)}")
+    print(f"{'operation':<28} {'rows':>10} {'old s':>10} {'new s':>10} {'time':>8} {'memory':>8}")
+    regressions = 0
+    for new in new_results:
+        before = old.get((new['operation'], new['rows']))
+        if before is None:
+            continue
+        time_change = new['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+        memory_change = new['peak_bytes'] / before['peak_bytes'] - 1 if before['peak_bytes'] else 0.0
+        flag = ""
+        timed = max(before['seconds'], new['seconds']) >= min_seconds
+        if (timed and time_change > threshold) or memory_change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        if new['result_rows'] != before['result_rows']:
+            flag += "  (result rows differ)"
+        print(f"{new['operation']:<28} {new['rows']:>10} {before['seconds']:>10.4f} {new['seconds']:>10.4f} "
+              f"{time_change:>+8.1%} {memory_change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark Project.py operations on synthetic NBA-shaped data")
+    parser.add_argument('--rows', nargs = '+', default = ['10k'], help = "table sizes, e.g. 10k 1m 10m")
+    parser.add_argument('--repeat', type = int, default = 3, help = "timed runs per operation (best is kept)")
+    parser.add_argument('--key-cardinality', type = int, default = 1000, help = "distinct player_id values")
+    parser.add_argument('--null-rate', type = float, default = 0.0,
+                        help = "chance a non-key cell is null (None in memory; an empty field in the CSV files, "
+                               "which load_csv reads as '')")
+    parser.add_argument('--player-rows', type = int, default = None,
+                        help = "rows in the player table (default: same as --rows)")
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--only', nargs = '+', help = "only run operations whose name contains one of these")
+    parser.add_argument('--data-dir', default = 'bench_data')
+    parser.add_argument('--output', help = "results file (default bench_results/<commit>.tsv)")
+    parser.add_argument('--compare', nargs = 2, metavar = ('OLD', 'NEW'), help = "compare two results files")
+    parser.add_argument('--threshold', type = float, default = 0.10, help = "slowdown flagged as a regression")
+    parser.add_argument('--min-seconds', type = float, default = 0.01,
+                        help = "timings below this are not flagged when comparing")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold, args.min_seconds)
+        sys.exit(1 if regressions else 0)
+
+    sizes = [parse_rows(size) for size in args.rows]
+    results = run(sizes, args.repeat, args.data_dir, args.seed, args.null_rate, args.key_cardinality,
+                  args.player_rows, args.only)
+
+    commit = git_commit()
+    metadata = {
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'null_rate': args.null_rate,
+        'key_cardinality': args.key_cardinality,
+    }
+    output = args.output or os.path.join('bench_results', f"{commit}.tsv")
+    write_results(output, results, metadata)
+    print(f"Results written to {output}", file = sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,31 @@
 # DSCI 551 Semester Project
 # NBA 2022/2023 Season Data (season after warriors took home the W)
 
+import copy
+import functools
+import hashlib
+import heapq
+import io
+import math
+import mmap
+import operator
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from itertools import chain, compress, count, islice, repeat
+from statistics import NormalDist
+
+
 # Converting values to correct data type
 def convert_value(value):
     #Getting ride of whitespace
@@ -34,55 +59,2829 @@ def convert_value(value):
 
 
 
+#////////////////////////  Column storage  /////////////////////////////////////
+# Int and float columns are kept in stdlib arrays ('q' / 'd', 8 bytes per cell)
+# instead of lists of boxed Python numbers. None cells are stored as 0 and marked
+# in a validity bitmap (bit set = value present). Strings, bools and mixed
+# columns stay as plain lists ("object" columns).
+#
+# Low-cardinality string columns can be dictionary encoded ("dict" columns):
+# the unique strings are kept once in a list and each cell holds a small
+# integer code into it (-1 = None). Columns taken from an encoded column share
+# its dictionary, and filters, grouping and joins work on the codes.
+_TYPECODES = {'int': 'q', 'float': 'd'}
+_NONE_TYPE = type(None)
+
+# load_csv encodes a string column when at most one value in ten is distinct
+# (e.g. a position column). Above that the codes plus the dictionary save
+# little over the plain strings.
+DICTIONARY_MAX_RATIO = 0.1
+
+# Column versions come from one counter, so a version is never reused
+_VERSIONS = count(1)
+# Every column object gets its own id too (unlike id(), never handed out twice)
+_COLUMN_IDS = count(1)
+
+
+def _bitmap_get(bits, i):
+    return bits[i >> 3] >> (i & 7) & 1
+
+
+def _bitmap_from_mask(mask, n):
+    bits = bytearray((n + 7) // 8)
+    for i, present in enumerate(mask):
+        if present:
+            bits[i >> 3] |= 1 << (i & 7)
+    return bits
+
+
+def _bitmap_ones(n):
+    bits = bytearray(b'\xff' * (n // 8))
+    if n % 8:
+        bits.append((1 << (n % 8)) - 1)
+    return bits
+
+
+# Appends other_n bits (None = all present) to a bitmap currently holding n bits
+def _bitmap_extend(bits, n, other_bits, other_n):
+    if other_bits is None:
+        other_bits = _bitmap_ones(other_n)
+
+    # Byte aligned: plain copy
+    if n % 8 == 0:
+        bits.extend(other_bits)
+        return bits
+
+    bits.extend(bytearray((n + other_n + 7) // 8 - len(bits)))
+    for i in range(other_n):
+        if _bitmap_get(other_bits, i):
+            j = n + i
+            bits[j >> 3] |= 1 << (j & 7)
+    return bits
+
+
+# Smallest signed array type that holds codes for a dictionary of n values
+def _code_typecode(n):
+    if n < 1 << 7:
+        return 'b'
+    if n < 1 << 15:
+        return 'h'
+    return 'i' if n < 1 << 31 else 'q'
+
+
+class Column:
+    def __init__(self, kind, values, validity = None, dictionary = None, lookup = None):
+        self.kind = kind                # 'int', 'float', 'dict' or 'object'
+        self.values = values            # array (or mapped memoryview) for int/float/dict, list for object
+        self.validity = validity        # bitmap, or None when the column has no nulls (always None for dict)
+        self.dictionary = dictionary    # unique strings of a dict column, indexed by code
+        self.lookup = lookup            # {string: code}, built on first use
+        self.stats = None               # ColumnStats, built when where() / df.stats() first need them
+        self.version = 0                # new value from _VERSIONS on every write
+        self.uid = next(_COLUMN_IDS)
+
+    # Dictionary-encoded copy of a string column, or None when the column holds
+    # anything but strings and None or has more than max_ratio distinct values per row
+    @classmethod
+    def encode(cls, column, max_ratio = 1.0):
+        if column.kind != 'object':
+            return column if column.kind == 'dict' else None
+        values = column if isinstance(column, ColumnView) else column.values
+        types = set(map(type, values))
+        types.discard(_NONE_TYPE)
+        if types != {str}:
+            return None
+
+        # Distinct strings in order of first appearance
+        lookup = dict.fromkeys(values)
+        lookup.pop(None, None)
+        if len(lookup) > max_ratio * len(values):
+            return None
+        dictionary = list(lookup)
+        lookup = {value: code for code, value in enumerate(dictionary)}
+
+        table = dict(lookup)
+        table[None] = -1
+        codes = array(_code_typecode(len(dictionary)), map(table.__getitem__, values))
+        return cls('dict', codes, dictionary = dictionary, lookup = lookup)
+
+    # Code of a string in a dict column's dictionary (None when it isn't there)
+    def code_of(self, value):
+        if self.lookup is None:
+            self.lookup = {v: i for i, v in enumerate(self.dictionary)}
+        try:
+            return -1 if value is None else self.lookup.get(value)
+        except TypeError:
+            return None
+
+    # Dictionary with None at the end, so code -1 decodes to None by indexing
+    def _decode_table(self):
+        return self.dictionary + [None]
+
+    # Picks the most compact storage for a list of converted values
+    @classmethod
+    def from_values(cls, values):
+        if isinstance(values, _COLUMN_TYPES):
+            return values
+
+        values = values if isinstance(values, list) else list(values)
+        types = set(map(type, values))
+        has_nulls = _NONE_TYPE in types
+        types.discard(_NONE_TYPE)
+
+        if types == {int}:
+            kind, fill = 'int', 0
+        elif types == {float}:
+            kind, fill = 'float', 0.0
+        else:
+            return cls('object', values)
+
+        validity = None
+        if has_nulls:
+            validity = _bitmap_from_mask((v is not None for v in values), len(values))
+            values = [fill if v is None else v for v in values]
+
+        try:
+            return cls(kind, array(_TYPECODES[kind], values), validity)
+        except OverflowError:
+            # Ints past 64 bits stay boxed
+            return cls('object', [None if validity is not None and not _bitmap_get(validity, i) else v
+                                  for i, v in enumerate(values)])
+
+    # Stitches chunk columns (e.g. from iter_csv) back into one column
+    @classmethod
+    def concat(cls, columns):
+        columns = [col.materialize() if isinstance(col, ColumnView) else col for col in columns]
+        kinds = {col.kind for col in columns}
+        if kinds == {'dict'}:
+            return cls._concat_dict(columns)
+        if len(kinds) != 1 or 'object' in kinds:
+            values = []
+            for col in columns:
+                values.extend(col)
+            return cls.from_values(values)
+
+        kind = kinds.pop()
+        values = array(_TYPECODES[kind])
+        validity = None
+        if any(col.validity is not None for col in columns):
+            validity = bytearray()
+            for col in columns:
+                _bitmap_extend(validity, len(values), col.validity, len(col))
+                values.extend(col.values)
+        else:
+            for col in columns:
+                values.extend(col.values)
+        return cls(kind, values, validity)
+
+    # Dict columns are stitched on their codes, merging the dictionaries
+    @classmethod
+    def _concat_dict(cls, columns):
+        dictionary = list(columns[0].dictionary)
+        lookup = {v: i for i, v in enumerate(dictionary)}
+        codes = []
+        for col in columns:
+            if col.dictionary is columns[0].dictionary:
+                codes.extend(col.values)
+                continue
+            remap = [lookup.setdefault(v, len(lookup)) for v in col.dictionary] + [-1]
+            codes.extend(map(remap.__getitem__, col.values))
+        return cls('dict', array(_code_typecode(len(lookup)), codes), dictionary = list(lookup), lookup = lookup)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        value = self.values[i]
+        if self.kind == 'dict':
+            return self.dictionary[value] if value >= 0 else None
+        if self.validity is not None:
+            if i < 0:
+                i += len(self.values)
+            if not _bitmap_get(self.validity, i):
+                return None
+        return value
+
+    def __setitem__(self, i, value):
+        self.version = next(_VERSIONS)
+        if i < 0:
+            i += len(self.values)
+        if self.kind == 'object':
+            self.values[i] = value
+            return
+
+        # Snapshot columns are read-only views of a mapped file; copy before writing
+        if isinstance(self.values, memoryview):
+            self.values = array(self.values.format if self.kind == 'dict' else _TYPECODES[self.kind],
+                                self.values.tobytes())
+            if self.validity is not None:
+                self.validity = bytearray(self.validity)
+
+        if self.kind == 'dict':
+            if value is not None and type(value) is not str:
+                self._to_object()
+                self.values[i] = value
+                return
+            code = self.code_of(value)
+            if code is None:
+                # New string: the dictionary may be shared, so extend a copy
+                code = len(self.dictionary)
+                self.dictionary = self.dictionary + [value]
+                self.lookup = dict(self.lookup)
+                self.lookup[value] = code
+                if _code_typecode(code + 1) != self.values.typecode:
+                    self.values = array(_code_typecode(code + 1), self.values)
+            self.values[i] = code
+            return
+
+        if value is None:
+            if self.validity is None:
+                self.validity = _bitmap_ones(len(self.values))
+            self.validity[i >> 3] &= ~(1 << (i & 7)) & 0xff
+            self.values[i] = 0
+        elif type(value) is (int if self.kind == 'int' else float):
+            try:
+                self.values[i] = value
+            except OverflowError:
+                self._to_object()
+                self.values[i] = value
+                return
+            if self.validity is not None:
+                self.validity[i >> 3] |= 1 << (i & 7)
+        else:
+            # Value doesn't fit the typed storage, fall back to a list
+            self._to_object()
+            self.values[i] = value
+
+    def _to_object(self):
+        self.values = self.to_list()
+        self.kind = 'object'
+        self.validity = None
+        self.dictionary = None
+        self.lookup = None
+
+    def __iter__(self):
+        if self.kind == 'dict':
+            return map(self._decode_table().__getitem__, self.values)
+        if self.validity is None:
+            return iter(self.values)
+        bits = self.validity
+        return (v if bits[i >> 3] >> (i & 7) & 1 else None for i, v in enumerate(self.values))
+
+    def __repr__(self):
+        preview = ", ".join(repr(v) for v in self[:5])
+        more = ", ..." if len(self) > 5 else ""
+        return f"Column({self.kind}, [{preview}{more}], length={len(self)})"
+
+    def to_list(self):
+        if self.validity is None and self.kind != 'dict':
+            return list(self.values) if self.kind == 'object' else self.values.tolist()
+        return list(self)
+
+    # New column holding the given rows (None in indices gives a null row)
+    def take(self, indices):
+        values = self.values
+        if self.kind == 'object':
+            return Column('object', [values[i] if i is not None else None for i in indices])
+        if self.kind == 'dict':
+            # Same dictionary, only the codes are copied
+            codes = array(values.format if isinstance(values, memoryview) else values.typecode,
+                          [values[i] if i is not None else -1 for i in indices])
+            return Column('dict', codes, dictionary = self.dictionary, lookup = self.lookup)
+
+        if self.validity is None and None not in indices:
+            return Column(self.kind, array(_TYPECODES[self.kind], map(values.__getitem__, indices)))
+
+        bits = self.validity
+        picked = [None if i is None or (bits is not None and not _bitmap_get(bits, i)) else values[i] for i in indices]
+        return Column.from_values(picked) if picked else Column(self.kind, array(_TYPECODES[self.kind]))
+
+    # Standalone copy of the column
+    def materialize(self):
+        return self.take(range(len(self.values)))
+
+    # Changes whenever the column's contents do (used as a cache key)
+    def fingerprint(self):
+        return (self.uid, self.version)
+
+    # Zero-copy view of the given rows
+    def view(self, rows):
+        return ColumnView(self, rows if isinstance(rows, array) else array('q', rows))
+
+    # Approximate memory held by the column's values
+    def nbytes(self):
+        if self.kind == 'object':
+            return sys.getsizeof(self.values) + sum(sys.getsizeof(v) for v in self.values)
+        if self.kind == 'dict':
+            return (self.values.itemsize * len(self.values) + sys.getsizeof(self.dictionary)
+                    + sum(sys.getsizeof(v) for v in self.dictionary))
+        return self.values.itemsize * len(self.values) + (len(self.validity) if self.validity is not None else 0)
+
+
+
+# Zero-copy view over a Column: the base column plus an optional array of
+# selected row numbers (None = every row). select() and where() hand these out
+# instead of copying; a view copies its rows only when materialize() is called
+# or when it is written to, so writes never leak back into the base column.
+class ColumnView:
+    def __init__(self, base, selection = None):
+        self.base = base
+        self.selection = selection
+        self._version = 0
+        self._owns_base = False
+
+    @property
+    def kind(self):
+        return self.base.kind
+
+    @property
+    def version(self):
+        return max(self._version, self.base.version)
+
+    def __len__(self):
+        return len(self.base) if self.selection is None else len(self.selection)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.base[i if self.selection is None else self.selection[i]]
+
+    def __setitem__(self, i, value):
+        # Copy on write
+        if not self._owns_base:
+            self.base = self.materialize()
+            self.selection = None
+            self._owns_base = True
+        self.base[i] = value
+        self._version = next(_VERSIONS)
+
+    def __iter__(self):
+        if self.selection is None:
+            return iter(self.base)
+        if self.base.kind == 'dict':
+            return map(self.base._decode_table().__getitem__, map(self.base.values.__getitem__, self.selection))
+        if self.base.kind == 'object' or self.base.validity is None:
+            return map(self.base.values.__getitem__, self.selection)
+        return map(self.base.__getitem__, self.selection)
+
+    def __repr__(self):
+        preview = ", ".join(repr(v) for v in self[:5])
+        more = ", ..." if len(self) > 5 else ""
+        return f"ColumnView({self.kind}, [{preview}{more}], length={len(self)})"
+
+    def to_list(self):
+        return self.base.to_list() if self.selection is None else list(self)
+
+    # Copies the viewed rows into a standalone Column
+    def materialize(self):
+        if self.selection is None:
+            return self.base.take(range(len(self.base)))
+        return self.base.take(self.selection)
+
+    def take(self, indices):
+        if self.selection is None:
+            return self.base.take(indices)
+        selection = self.selection
+        return self.base.take([selection[i] if i is not None else None for i in indices])
+
+    # Same as the base column's fingerprint when every row is viewed, so
+    # select() results share cache entries with the frame they came from
+    def fingerprint(self):
+        if self.selection is None:
+            return self.base.fingerprint()
+        return self.base.fingerprint() + (hashlib.sha1(self.selection).digest(),)
+
+    # A view of this view's rows, pointing straight at the base column
+    def view(self, rows):
+        if self.selection is None:
+            return ColumnView(self.base, rows if isinstance(rows, array) else array('q', rows))
+        return ColumnView(self.base, array('q', map(self.selection.__getitem__, rows)))
+
+    # Only the selection is owned by the view
+    def nbytes(self):
+        return 0 if self.selection is None else self.selection.itemsize * len(self.selection)
+
+
+_COLUMN_TYPES = (Column, ColumnView)
+
+
+# (codes, base column) of a dict column or a view of one, else None. The codes
+# follow the view's selection; decode them through the base column.
+def _dictionary_codes(column):
+    base, selection = (column.base, column.selection) if isinstance(column, ColumnView) else (column, None)
+    if base.kind != 'dict':
+        return None
+    return (base.values if selection is None else map(base.values.__getitem__, selection)), base
+
+
+# New view of the same rows, so writing to it leaves the original alone
+def _alias(column):
+    if isinstance(column, ColumnView):
+        return ColumnView(column.base, column.selection)
+    return ColumnView(column)
+
+
+# Views of several columns over the same rows. Columns that already share a
+# selection (e.g. all columns of an earlier where()) share the new one too, so
+# the row numbers are composed once per call instead of once per column.
+def _view_columns(columns, rows):
+    rows = rows if isinstance(rows, array) else array('q', rows)
+    composed = {}
+    views = {}
+    for name, column in columns.items():
+        if isinstance(column, ColumnView) and column.selection is not None:
+            key = id(column.selection)
+            if key not in composed:
+                composed[key] = array('q', map(column.selection.__getitem__, rows))
+            views[name] = ColumnView(column.base, composed[key])
+        elif isinstance(column, ColumnView):
+            views[name] = ColumnView(column.base, rows)
+        else:
+            views[name] = ColumnView(column, rows)
+    return views
+
+
+
+#////////////////////////  Schema inference  /////////////////////////////////////
+# Instead of running convert_value's full int/float/bool/str detection on every
+# cell, the loader samples the first rows, picks one type per column and parses
+# the column with a specialized converter. Cells that don't fit the column's
+# type fall back to convert_value, so the results are the same.
+SAMPLE_ROWS = 100
+
+
+def _parse_int(value):
+    stripped = value.strip()
+    if stripped.isdigit() or (stripped[:1] == '-' and stripped[1:].isdigit()):
+        return int(stripped)
+    return convert_value(value)
+
+
+def _parse_float(value):
+    stripped = value.strip()
+    if '.' in stripped:
+        try:
+            return float(stripped)
+        except ValueError:
+            pass
+    return convert_value(value)
+
+
+def _parse_bool(value):
+    lowered = value.strip().lower()
+    if lowered == 'true':
+        return True
+    if lowered == 'false':
+        return False
+    return convert_value(value)
+
+
+def _parse_str(value):
+    stripped = value.strip()
+    first = stripped[:1]
+
+    # Plain text: no quotes, not numeric looking, not a bool
+    if first and not first.isdigit() and first not in '-"\'' and '.' not in stripped \
+            and stripped.lower() not in ('true', 'false'):
+        return stripped
+    return convert_value(value)
+
+
+_CONVERTERS = {'int': _parse_int, 'float': _parse_float, 'bool': _parse_bool, 'str': _parse_str}
+
+
+# Accepts 'int' / int style schema entries
+def _schema_type(column_type):
+    name = column_type.__name__ if isinstance(column_type, type) else column_type
+    if name not in _CONVERTERS:
+        raise ValueError(f"Unknown column type '{column_type}', expected one of {list(_CONVERTERS)}")
+    return name
+
+
+# Picks a type per column from already split sample rows. positions gives each
+# column's field number in the file (defaults to 0, 1, 2, ...).
+def _infer_types(sample, column_names, positions = None):
+    schema = {}
+    for i, column_name in zip(positions or range(len(column_names)), column_names):
+        types = {type(convert_value(row[i])) for row in sample if i < len(row) and row[i] is not None}
+
+        if types == {int}:
+            schema[column_name] = 'int'
+        elif types and types <= {int, float}:
+            schema[column_name] = 'float'
+        elif types == {bool}:
+            schema[column_name] = 'bool'
+        else:
+            schema[column_name] = 'str'
+    return schema
+
+
+def _converters_for(schema, column_names):
+    # Columns missing from an explicit schema get the generic path
+    return [_CONVERTERS[_schema_type(schema[name])] if name in schema else convert_value for name in column_names]
+
+
+def _clean_header(header, separator):
+    return [col.strip().strip('"').strip("'") for col in header.strip().split(separator)]
+
+
+# Reads the header and the first sample_rows rows and returns the inferred
+# schema, e.g. {'id': 'int', 'full_name': 'str', ...}
+def sniff_schema(csv_file, separator = ',', sample_rows = SAMPLE_ROWS):
+    with open(csv_file, 'r') as file:
+        column_names = _clean_header(file.readline(), separator)
+        rows = (line.strip() for line in file)
+        sample = [line.split(separator) for line in islice((line for line in rows if line), sample_rows)]
+    return _infer_types(sample, column_names)
+
+
+
 #////////////////////////  Data loading and parsing  /////////////////////////////////////
-def load_csv(csv_file, separator = ','):
+# Rows per chunk handed out by iter_csv
+CHUNK_ROWS = 65536
+
+
+# Converts a chunk of split rows column by column (missing values become None).
+# positions gives the field number of each wanted column.
+def _rows_to_frame(rows, column_names, positions, converters):
     data = {}
-    column_names = []
+    for column_name, i, convert in zip(column_names, positions, converters):
+        data[column_name] = [convert(values[i]) if i < len(values) else None for values in rows]
+    return dataFrame(data, column_names)
+
+
+# Stacks frames with the same columns into one dataFrame
+def _concat_frames(frames, column_names):
+    chunks = {x: [] for x in column_names}
+    for frame in frames:
+        for column_name in column_names:
+            chunks[column_name].append(frame.data[column_name])
+
+    # Stitch the per-chunk typed columns together
+    data = {x: Column.concat(chunks.pop(x)) if chunks[x] else [] for x in column_names}
+    return dataFrame(data, column_names)
+
+
+# Column names to load and their field numbers (columns=None keeps them all)
+def _pick_columns(header, columns = None):
+    if columns is None:
+        return header, list(range(len(header)))
+
+    for col in columns:
+        if col not in header:
+            raise KeyError(f"Column '{col}' doesn't exist!")
+    return list(columns), [header.index(col) for col in columns]
+
+
+# Streaming reader: yields dataFrame chunks of at most chunk_rows rows, so only
+# one chunk of parsed values is held at a time (no readlines()). The column
+# types are sniffed from the first sample_rows rows unless a schema is given.
+# With columns=[...] only those fields are converted; the rest are never parsed.
+# csv_file can be a path or an open text stream.
+def iter_csv(csv_file, separator = ',', chunk_rows = CHUNK_ROWS, schema = None, sample_rows = SAMPLE_ROWS,
+             columns = None):
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be at least 1")
+
+    # Paths are opened here; open text streams (e.g. io.StringIO) are read as they are
+    source = nullcontext(csv_file) if hasattr(csv_file, 'read') else open(csv_file, 'r', buffering = 1 << 20)
+    with source as file:
+        header = file.readline()
+        if not header:
+            raise ValueError(f"'{getattr(csv_file, 'name', csv_file)}' is empty!")
+
+        #cleaning column names
+        column_names, positions = _pick_columns(_clean_header(header, separator), columns)
+
+        # Split non-empty lines lazily
+        lines = (line.strip() for line in file)
+        rows = (line.split(separator) for line in lines if line)
+
+        if schema is None:
+            sample = list(islice(rows, sample_rows))
+            schema = _infer_types(sample, column_names, positions)
+            rows = chain(sample, rows)
+        converters = _converters_for(schema, column_names)
+
+        chunk = []
+        yielded = False
+        for values in rows:
+            chunk.append(values)
+            if len(chunk) == chunk_rows:
+                yield _rows_to_frame(chunk, column_names, positions, converters)
+                yielded = True
+                chunk = []
+
+        # Last partial chunk (always yield one so header-only files keep their columns)
+        if chunk or not yielded:
+            yield _rows_to_frame(chunk, column_names, positions, converters)
+
+
+# String columns with few distinct values (see DICTIONARY_MAX_RATIO) come back
+# dictionary encoded unless dictionary_encode=False. Block statistics
+# (ColumnStats) are built the first time where() or df.stats() needs them, or
+# here for every column with column_stats=True.
+def load_csv(csv_file, separator = ',', schema = None, sample_rows = SAMPLE_ROWS, columns = None, workers = None,
+             memory_map = False, dictionary_encode = True, column_stats = False):
+    if memory_map:
+        with MappedCSV(csv_file, separator) as mapped:
+            df = mapped.to_dataFrame(columns, schema, sample_rows)
+        data, column_names = df.data, df.column_names
+    elif workers is not None and workers > 1:
+        data, column_names = _load_csv_parallel(csv_file, separator, schema, sample_rows, columns, workers)
+    else:
+        frames = iter_csv(csv_file, separator, schema = schema, sample_rows = sample_rows, columns = columns)
+        first = next(frames)
+        column_names = first.column_names
+        data = _concat_frames(chain([first], frames), column_names).data
+
+    if dictionary_encode:
+        for name in column_names:
+            encoded = Column.encode(data[name], DICTIONARY_MAX_RATIO)
+            if encoded is not None:
+                data[name] = encoded
+    if column_stats:
+        for name in column_names:
+            data[name].stats = ColumnStats(data[name])
+    return data, column_names
+
+
+
+#////////////////////////  Parallel loading  /////////////////////////////////////
+# load_csv(path, workers=N) cuts the rows into byte ranges that start and end on
+# line boundaries, parses the ranges in a process pool and stitches the columns
+# back together in file order. Every worker uses the schema sniffed by the
+# parent (with the usual convert_value fallback), so the result is the same as
+# a serial load.
+RANGE_BYTES = 32 * 1024 * 1024
+
+
+# Moves past the first line, ending it at \n, \r or \r\n like text mode does
+def _skip_line(file):
+    while True:
+        byte = file.read(1)
+        if byte in (b'\n', b''):
+            return
+        if byte == b'\r':
+            if file.read(1) not in (b'\n', b''):
+                file.seek(-1, os.SEEK_CUR)
+            return
+
+
+# [(start, end)] byte ranges covering everything after the header. Later
+# range ends only fall after a \n, so a file using bare \r line endings stays
+# in one range.
+def _byte_ranges(csv_file, parts):
+    size = os.path.getsize(csv_file)
+    with open(csv_file, 'rb') as file:
+        _skip_line(file)
+        start = file.tell()
+        bounds = [start]
+
+        for k in range(1, parts):
+            position = start + (size - start) * k // parts
+            if position <= bounds[-1]:
+                continue
+            # Move forward to the start of the next line
+            file.seek(position - 1)
+            file.readline()
+            if bounds[-1] < file.tell() < size:
+                bounds.append(file.tell())
+
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+# Worker: parses one byte range into {column: Column}
+def _parse_byte_range(task):
+    csv_file, start, end, encoding, separator, column_names, positions, schema = task
+    with open(csv_file, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
 
+    # Same line handling as reading the file in text mode
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    rows = [line.split(separator) for line in (line.strip() for line in text.split('\n')) if line]
+    return _rows_to_frame(rows, column_names, positions, _converters_for(schema, column_names)).data
+
+
+def _load_csv_parallel(csv_file, separator, schema, sample_rows, columns, workers):
     with open(csv_file, 'r') as file:
-        lines = file.readlines()
-        column_names = lines[0].strip().split(separator)
+        header = file.readline()
+        encoding = file.encoding
+        if not header:
+            raise ValueError(f"'{csv_file}' is empty!")
+
+        column_names, positions = _pick_columns(_clean_header(header, separator), columns)
+
+        # Sniff once here so every range gets the same converters
+        if schema is None:
+            lines = (line.strip() for line in file)
+            sample = [line.split(separator) for line in islice((line for line in lines if line), sample_rows)]
+            schema = _infer_types(sample, column_names, positions)
+
+    # At least one range per worker, more for big files to keep each one small
+    size = os.path.getsize(csv_file)
+    parts = max(workers, -(-size // RANGE_BYTES))
+    tasks = [(csv_file, start, end, encoding, separator, column_names, positions, schema)
+             for start, end in _byte_ranges(csv_file, parts)]
+
+    chunks = {x: [] for x in column_names}
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        # map() hands results back in range order
+        for data in pool.map(_parse_byte_range, tasks):
+            for x in column_names:
+                chunks[x].append(data[x])
+
+    data = {x: Column.concat(chunks[x]) if chunks[x] else Column.from_values([]) for x in column_names}
+    return data, column_names
 
-        #cleaning column names
-        column_names = [col.strip().strip('"').strip("'") for col in column_names]
 
-        # dictionary for storing data
-        data = {x: [] for x in column_names}
 
+#////////////////////////  Memory-mapped loading  /////////////////////////////////////
+# MappedCSV maps the file into memory and works on the raw bytes: line offsets
+# are found with mmap.find, fields are cut out of a memoryview and only the
+# requested columns are ever decoded and converted. Row counts and field
+# offsets come from the byte scan alone. Lines end at \n, \r or \r\n and the
+# text is decoded with open()'s default encoding, the same as iter_csv.
+_LINE_BREAK = re.compile(rb'\r\n?|\n')
+
+
+class MappedCSV:
+    def __init__(self, csv_file, separator = ',', encoding = None):
+        if encoding is None:
+            with open(csv_file, 'r') as file:
+                encoding = file.encoding
+        self.path = csv_file
+        self.encoding = encoding
+        self.separator = separator.encode(encoding)
+        self._file = open(csv_file, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"'{csv_file}' is empty!")
+        self._view = memoryview(self._map)
+
+        header_end, self._data_start = self._line_break(0)
+        self.column_names = _clean_header(str(self._view[:header_end], encoding), separator)
+        self._starts = None
+        self._ends = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    # (end of the line starting at position, start of the next line)
+    def _line_break(self, position):
+        match = _LINE_BREAK.search(self._map, position)
+        if match is None:
+            return len(self._map), len(self._map)
+        return match.start(), match.end()
+
+    # Start/end byte offsets (line break excluded) of every non-blank data
+    # line (scanned once)
+    def line_offsets(self):
+        if self._starts is None:
+            mm = self._map
+            size = len(mm)
+            starts = array('q')
+            ends = array('q')
+            position = self._data_start
+            # Without any \r a plain find for \n is enough (and faster)
+            plain = mm.find(b'\r', position) == -1
+
+            while position < size:
+                if plain:
+                    end = mm.find(b'\n', position)
+                    end, after = (size, size) if end == -1 else (end, end + 1)
+                else:
+                    end, after = self._line_break(position)
+                # Skip blank lines; most lines start with a visible byte
+                if end > position and (mm[position] > 32 or mm[position:end].strip()):
+                    starts.append(position)
+                    ends.append(end)
+                position = after
+
+            self._starts, self._ends = starts, ends
+        return self._starts, self._ends
+
+    @property
+    def row_count(self):
+        return len(self.line_offsets()[0])
+
+    # [(start, end)] byte offsets of each field in a row, nothing decoded
+    def field_offsets(self, row):
+        starts, ends = self.line_offsets()
+        mm = self._map
+        position, end = starts[row], ends[row]
+
+        offsets = []
+        while True:
+            cut = mm.find(self.separator, position, end)
+            if cut == -1:
+                offsets.append((position, end))
+                return offsets
+            offsets.append((position, cut))
+            position = cut + len(self.separator)
+
+    # Raw text of the wanted fields (by field number) for rows [first, last)
+    def _fields(self, positions, first, last):
+        mm = self._map
+        view = self._view
+        encoding = self.encoding
+        separator = self.separator
+        width = len(separator)
+        last_needed = max(positions)
+        starts, ends = self.line_offsets()
+        fields = [[] for _ in positions]
+        slot = {p: k for k, p in enumerate(positions)}
+
+        for row in range(first, last):
+            position, end = starts[row], ends[row]
+            field = 0
+            while True:
+                cut = mm.find(separator, position, end)
+                if field in slot:
+                    fields[slot[field]].append(str(view[position:end if cut == -1 else cut], encoding))
+                if cut == -1 or field == last_needed:
+                    break
+                position = cut + width
+                field += 1
+
+            # Short rows are padded with None
+            if field < last_needed:
+                for p in positions:
+                    if p > field:
+                        fields[slot[p]].append(None)
+        return fields
+
+    def to_dataFrame(self, columns = None, schema = None, sample_rows = SAMPLE_ROWS, chunk_rows = CHUNK_ROWS):
+        column_names, positions = _pick_columns(self.column_names, columns)
+        if not column_names:
+            return dataFrame({}, [])
+        rows = self.row_count
+
+        if schema is None:
+            sample = self._fields(positions, 0, min(sample_rows, rows))
+            schema = _infer_types([list(values) for values in zip(*sample)], column_names)
+        converters = _converters_for(schema, column_names)
+
+        chunks = {x: [] for x in column_names}
+        for first in range(0, rows, chunk_rows):
+            fields = self._fields(positions, first, min(first + chunk_rows, rows))
+            for name, convert, values in zip(column_names, converters, fields):
+                chunks[name].append(Column.from_values([convert(v) if v is not None else None for v in values]))
+
+        data = {x: Column.concat(chunks[x]) if chunks[x] else Column.from_values([]) for x in column_names}
+        return dataFrame(data, column_names)
+
+
+
+#////////////////////////  Value encoding  /////////////////////////////////////
+# One-line text form of a cell value that keeps its type (n / b / i / f / s
+# prefix), used for the snapshot string dictionary and for spill files.
+def _encode_value(value):
+    if value is None:
+        return 'n'
+    if value is True or value is False:
+        return 'b1' if value else 'b0'
+    if type(value) is int:
+        return f'i{value}'
+    if type(value) is float:
+        return f'f{value!r}'
+    if type(value) is str:
+        return 's' + value.replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+    raise ValueError(f"Can't encode value of type {type(value).__name__}")
+
+
+_UNESCAPES = {'\\': '\\', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def _decode_value(text):
+    tag = text[:1]
+    if tag == 'n':
+        return None
+    if tag == 'b':
+        return text == 'b1'
+    if tag == 'i':
+        return int(text[1:])
+    if tag == 'f':
+        return float(text[1:])
+    if '\\' not in text:
+        return text[1:]
+
+    # Undo the escapes one character at a time
+    result = []
+    chars = iter(text[1:])
+    for char in chars:
+        result.append(_UNESCAPES[next(chars)] if char == '\\' else char)
+    return ''.join(result)
+
+
+
+#////////////////////////  Columnar snapshots  /////////////////////////////////////
+# df.save_columnar(path) / dataFrame.load_columnar(path). The file is a short
+# text header followed by 8-byte aligned buffers:
+#   DFCOL 1
+#   byteorder little
+#   rows 4831
+#   column int 0 38648 0 0 sid          <- kind, buffer a, buffer b, name
+#   ...
+#   end
+# int/float columns: a = raw 'q'/'d' array, b = validity bitmap (empty if no nulls)
+# object columns:    a = 'q' codes into b, b = string dictionary (one encoded value per line)
+# dict columns:      a = 'b'/'h'/'i' codes (sized by the dictionary, -1 = None), b = dictionary
+# Loading maps the file, so int and float columns are used straight from the
+# page cache without parsing or copying.
+_SNAPSHOT_MAGIC = 'DFCOL 1'
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+# Hash key that keeps 1, 1.0 and True apart in the string dictionary
+class _SnapshotKey:
+    __slots__ = ('value', 'kind')
+
+    def __init__(self, value):
+        self.value = value
+        self.kind = type(value)
+
+    def __hash__(self):
+        return hash((self.kind, self.value))
+
+    def __eq__(self, other):
+        return self.kind is other.kind and self.value == other.value
+
+
+# (kind, buffer a, buffer b) for one column
+def _snapshot_buffers(column):
+    if isinstance(column, ColumnView):
+        column = column.materialize()
+
+    # Dict columns already have their codes and dictionary
+    if column.kind == 'dict':
+        text = '\n'.join(map(_encode_value, column.dictionary))
+        codes = array(_code_typecode(len(column.dictionary)), column.values)
+        return 'dict', codes.tobytes(), text.encode('utf-8')
+
+    if column.kind == 'object':
+        codes = {}
+        code_array = array('q')
+        for value in column:
+            key = _SnapshotKey(value)
+            code = codes.get(key)
+            if code is None:
+                code = codes[key] = len(codes)
+            code_array.append(code)
+        text = '\n'.join(_encode_value(key.value) for key in codes)
+        return 'object', code_array.tobytes(), text.encode('utf-8')
+
+    values = column.values
+    data = values.tobytes() if isinstance(values, array) else bytes(values)
+    return column.kind, data, bytes(column.validity) if column.validity is not None else b''
+
+
+def _save_columnar(df, path):
+    layout = []
+    buffers = []
+    offset = 0
+    for name in df.column_names:
+        kind, a, b = _snapshot_buffers(df.data[name])
+        a_offset = offset
+        offset = _align8(offset + len(a))
+        b_offset = offset
+        offset = _align8(offset + len(b))
+        layout.append(f"column {kind} {a_offset} {len(a)} {b_offset} {len(b)} {_encode_value(name)}")
+        buffers.append((a_offset, a))
+        buffers.append((b_offset, b))
+
+    header = "\n".join([_SNAPSHOT_MAGIC, f"byteorder {sys.byteorder}", f"rows {df.shape[0]}"] + layout + ["end", ""])
+    header = header.encode('utf-8')
+    start = _align8(len(header))
+
+    with open(path, 'wb') as file:
+        file.write(header)
+        file.write(b'\0' * (start - len(header)))
+        position = 0
+        for buffer_offset, data in buffers:
+            file.write(b'\0' * (buffer_offset - position))
+            file.write(data)
+            position = buffer_offset + len(data)
+
+
+def _load_columnar(path):
+    with open(path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"'{path}' is empty!")
+
+    header_end = mapped.find(b'\nend\n')
+    lines = mapped[:header_end].decode('utf-8').split('\n') if header_end != -1 else []
+    if not lines or lines[0] != _SNAPSHOT_MAGIC:
+        mapped.close()
+        raise ValueError(f"'{path}' is not a columnar snapshot!")
+
+    byteorder = lines[1].split(' ', 1)[1]
+    start = _align8(header_end + len(b'\nend\n'))
+    view = memoryview(mapped)
+
+    data = {}
+    column_names = []
+    for line in lines[3:]:
+        _, kind, a_offset, a_length, b_offset, b_length, name = line.split(' ', 6)
+        name = _decode_value(name)
+        a = view[start + int(a_offset):start + int(a_offset) + int(a_length)]
+        b = view[start + int(b_offset):start + int(b_offset) + int(b_length)]
+
+        if kind == 'object':
+            dictionary = [_decode_value(text) for text in str(b, 'utf-8').split('\n')] if len(b) else []
+            codes = a.cast('q')
+            data[name] = Column('object', list(map(dictionary.__getitem__, codes)))
+        elif kind == 'dict':
+            dictionary = [_decode_value(text) for text in str(b, 'utf-8').split('\n')] if len(b) else []
+            codes = a.cast(_code_typecode(len(dictionary)))
+            if byteorder != sys.byteorder:
+                codes = array(codes.format, codes.tobytes())
+                codes.byteswap()
+            data[name] = Column('dict', codes, dictionary = dictionary)
+        else:
+            values = a.cast(_TYPECODES[kind])
+            if byteorder != sys.byteorder:
+                values = array(_TYPECODES[kind], values.tobytes())
+                values.byteswap()
+            data[name] = Column(kind, values, b if len(b) else None)
+        column_names.append(name)
+
+    return dataFrame(data, column_names)
+
+
+# Loads csv_file through a snapshot next to it (or at snapshot_path), parsing
+# the CSV only when the snapshot is missing or older than the CSV
+def load_with_snapshot(csv_file, snapshot_path = None, separator = ','):
+    snapshot_path = snapshot_path or csv_file + '.dfcol'
+    if os.path.exists(snapshot_path) and os.path.getmtime(snapshot_path) >= os.path.getmtime(csv_file):
+        try:
+            return dataFrame.load_columnar(snapshot_path)
+        except ValueError:
+            pass
+
+    data, column_names = load_csv(csv_file, separator)
+    df = dataFrame(data, column_names)
+    df.save_columnar(snapshot_path)
+    return df
+
+
+
+#////////////////////////  Frame caches  /////////////////////////////////////
+# Least recently used dataFrames kept under a memory budget (max_bytes, as
+# counted by dataFrame.nbytes()). Frames bigger than the whole budget are not kept.
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # key -> (dataFrame, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, df):
+        size = df.nbytes()
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[1]
+        self.entries[key] = (df, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last = False)
+            self.total_bytes -= evicted
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Keeps parsed dataFrames keyed on a hash of the raw CSV bytes, so the same
+# upload is parsed once. With snapshot_dir set, a miss first looks for a
+# columnar snapshot of the same bytes and writes one after parsing.
+# Snapshots outlive evicted entries, so those reload without parsing. Use a
+# directory only this process can write to (snapshots are loaded without
+# further checks) and remove it when done.
+class ParseCache(FrameCache):
+    def __init__(self, max_bytes = 256 * 1024 * 1024, snapshot_dir = None):
+        super().__init__(max_bytes)
+        self.snapshot_dir = snapshot_dir
 
-        for line in lines[1:]:
-            stripped_values = line.strip()
+    def get_or_parse(self, content, separator = ','):
+        digest = hashlib.sha1(content).hexdigest()
+        df = self.get(digest)
+        if df is None:
+            df = self._load(content, digest, separator)
+            self.put(digest, df)
+        return df
 
-            if not stripped_values:
-                continue
-            values = stripped_values.split(separator)
+    def _load(self, content, digest, separator):
+        snapshot_path = None
+        if self.snapshot_dir is not None:
+            snapshot_path = os.path.join(self.snapshot_dir, f"dsci551_{digest}.dfcol")
+            if os.path.exists(snapshot_path):
+                try:
+                    return dataFrame.load_columnar(snapshot_path)
+                except ValueError:
+                    pass
+
+        # Parsed straight from memory, no temp file
+        data, column_names = load_csv(io.StringIO(content.decode('utf-8'), newline = None), separator)
+        df = dataFrame(data, column_names)
+        if snapshot_path is not None:
+            df.save_columnar(snapshot_path)
+        return df
+
+
+# Results of agg() (and the methods built on it) and join(), keyed on the
+# fingerprints of the columns they read plus a description of the operation.
+# Writing to a column changes its fingerprint, so results computed from the
+# old data are never returned again (they age out of the LRU).
+# Set RESULT_CACHE.max_bytes = 0 to turn caching off.
+RESULT_CACHE = FrameCache(max_bytes = 64 * 1024 * 1024)
+
+
+
+#////////////////////////  Column expressions  /////////////////////////////////////
+# Predicates for where() that are evaluated a whole column at a time into a
+# True/False mask, without building a dictionary per row:
+#   df.where((col('points_per_game') > 20) & (col('position') == 'PG'))
+# & and | bind tighter than comparisons in Python, so wrap each comparison in
+# parentheses. A None value never satisfies a comparison.
+_COMPARISONS = {
+    '>': operator.gt, '<': operator.lt, '>=': operator.ge,
+    '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+
+
+class Expr:
+    def __gt__(self, other):
+        return Compare('>', self, _as_expr(other))
+
+    def __lt__(self, other):
+        return Compare('<', self, _as_expr(other))
+
+    def __ge__(self, other):
+        return Compare('>=', self, _as_expr(other))
+
+    def __le__(self, other):
+        return Compare('<=', self, _as_expr(other))
+
+    def __eq__(self, other):
+        return Compare('==', self, _as_expr(other))
+
+    def __ne__(self, other):
+        return Compare('!=', self, _as_expr(other))
+
+    def __and__(self, other):
+        return And(self, _as_expr(other))
+
+    def __rand__(self, other):
+        return And(_as_expr(other), self)
+
+    def __or__(self, other):
+        return Or(self, _as_expr(other))
+
+    def __ror__(self, other):
+        return Or(_as_expr(other), self)
 
-            for i, column_name in enumerate(column_names):
+    def __invert__(self):
+        return Not(self)
 
-                #Converting values to their data type
-                if i < len(values):
-                    converted_value = convert_value(values[i])
-                    data[column_name].append(converted_value)
+    __hash__ = None
 
+    def __bool__(self):
+        raise TypeError("Expressions can't be used as True/False; combine them with & | ~ "
+                        "and wrap each comparison in parentheses")
+
+    # Names of the columns this expression reads
+    def columns(self):
+        return set()
+
+    # Same expression with column names swapped through mapping
+    def rename(self, mapping):
+        return self
+
+
+class Col(Expr):
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"col({self.name!r})"
+
+    def columns(self):
+        return {self.name}
+
+    def rename(self, mapping):
+        return Col(mapping.get(self.name, self.name))
+
+    def values(self, df):
+        if self.name not in df.data:
+            raise KeyError(f"Column '{self.name}' not found!")
+        return df.data[self.name]
+
+
+class Lit(Expr):
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return repr(self.value)
+
+    def values(self, df):
+        return repeat(self.value, df.shape[0])
+
+
+class Compare(Expr):
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        return f"({self.left!r} {self.op} {self.right!r})"
+
+    def columns(self):
+        return self.left.columns() | self.right.columns()
+
+    def rename(self, mapping):
+        return Compare(self.op, self.left.rename(mapping), self.right.rename(mapping))
+
+    def mask(self, df):
+        compare = _COMPARISONS[self.op]
+
+        # Column against a constant: the common case
+        if isinstance(self.right, Lit):
+            value = self.right.value
+            if value is None:
+                return [False] * df.shape[0]
+            encoded = _dictionary_codes(self.left.values(df)) if isinstance(self.left, Col) else None
+            if encoded is not None:
+                # Compare each distinct string once, then look the codes up
+                codes, column = encoded
+                table = [compare(v, value) for v in column.dictionary] + [False]
+                return list(map(table.__getitem__, codes))
+            return [v is not None and compare(v, value) for v in self.left.values(df)]
+
+        return [a is not None and b is not None and compare(a, b)
+                for a, b in zip(self.left.values(df), self.right.values(df))]
+
+
+class And(Expr):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        return f"({self.left!r} & {self.right!r})"
+
+    def columns(self):
+        return self.left.columns() | self.right.columns()
+
+    def rename(self, mapping):
+        return And(self.left.rename(mapping), self.right.rename(mapping))
+
+    def mask(self, df):
+        return [a and b for a, b in zip(self.left.mask(df), self.right.mask(df))]
+
+
+class Or(Expr):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        return f"({self.left!r} | {self.right!r})"
+
+    def columns(self):
+        return self.left.columns() | self.right.columns()
+
+    def rename(self, mapping):
+        return Or(self.left.rename(mapping), self.right.rename(mapping))
+
+    def mask(self, df):
+        return [a or b for a, b in zip(self.left.mask(df), self.right.mask(df))]
+
+
+class Not(Expr):
+    def __init__(self, inner):
+        self.inner = inner
+
+    def __repr__(self):
+        return f"~{self.inner!r}"
+
+    def columns(self):
+        return self.inner.columns()
+
+    def rename(self, mapping):
+        return Not(self.inner.rename(mapping))
+
+    def mask(self, df):
+        return [not m for m in self.inner.mask(df)]
+
+
+def _as_expr(value):
+    return value if isinstance(value, Expr) else Lit(value)
+
+
+# Reference to a column inside an expression
+def col(name):
+    return Col(name)
+
+
+# Splits a & b & c into [a, b, c]
+def _conjuncts(expr):
+    if isinstance(expr, And):
+        return _conjuncts(expr.left) + _conjuncts(expr.right)
+    return [expr]
+
+
+def _conjunction(exprs):
+    result = exprs[0]
+    for expr in exprs[1:]:
+        result = And(result, expr)
+    return result
+
+
+
+#////////////////////////  Secondary indexes  /////////////////////////////////////
+# df.create_index(col, kind='hash' | 'sorted'). where() uses them for equality
+# (dict conditions, col(...) == value) and range (col(...) > value) predicates,
+# and join() reuses a hash index on the right key instead of building a table.
+# An index remembers the column version it was built from and is rebuilt if
+# the column has been modified since.
+class HashIndex:
+    kind = 'hash'
+
+    def __init__(self, column):
+        self.column = column
+        self.version = column.version
+        self.table = {}
+        for i, value in enumerate(column):
+            self.table.setdefault(value, []).append(i)
+
+    # Rows equal to value, in row order
+    def lookup(self, value):
+        return self.table.get(value, [])
+
+
+class SortedIndex:
+    kind = 'sorted'
+
+    def __init__(self, column):
+        self.column = column
+        self.version = column.version
+        try:
+            pairs = sorted((value, i) for i, value in enumerate(column) if value is not None)
+        except TypeError:
+            raise ValueError("A sorted index needs values that can be compared with each other")
+        self.keys = [value for value, _ in pairs]
+        self.rows = array('q', [i for _, i in pairs])
+
+    def lookup(self, value):
+        if value is None:
+            return []
+        return self.rows[bisect_left(self.keys, value):bisect_right(self.keys, value)].tolist()
+
+    # Rows with low < value < high (or <= when inclusive), in row order. None
+    # values never match, like in column expressions.
+    def range(self, low = None, high = None, low_inclusive = True, high_inclusive = True):
+        start = 0
+        end = len(self.keys)
+        if low is not None:
+            start = bisect_left(self.keys, low) if low_inclusive else bisect_right(self.keys, low)
+        if high is not None:
+            end = bisect_right(self.keys, high) if high_inclusive else bisect_left(self.keys, high)
+        return sorted(self.rows[start:end]) if start < end else []
+
+
+_INDEX_KINDS = {'hash': HashIndex, 'sorted': SortedIndex}
+
+
+
+#////////////////////////  Column statistics  /////////////////////////////////////
+# Each column gets a zone map: min, max, null count and distinct count for
+# each block of STATS_BLOCK_ROWS rows, plus a bottom-k sketch of value hashes
+# (the _SKETCH_VALUES smallest) that gives an approximate distinct count for
+# the whole column. It is built the first time where() or df.stats() needs it,
+# however the frame was made (load_csv, a snapshot, a dict of lists), and kept
+# on the column. where() only evaluates the blocks whose min/max can match
+# every `col(...) <op> value` part of the condition, and later df.stats()
+# calls read the column profiles without a scan. Like indexes, stats remember
+# the column version and are rebuilt after a write.
+STATS_BLOCK_ROWS = 8192     # a multiple of 8, so blocks start on a validity byte
+_SKETCH_VALUES = 256
+_SKETCH_SALT = 0x5BD1E995
+_ZONE_OPS = ('==', '<', '<=', '>', '>=')
+
+
+# (distinct non-None values, null count) of rows start:end of a column
+def _block_values(column, start, end):
+    values = column.values[start:end]
+    if column.kind == 'dict':
+        codes = values.tolist() if isinstance(values, memoryview) else values
+        used = set(codes)
+        used.discard(-1)
+        return {column.dictionary[code] for code in used}, codes.count(-1)
+    if column.kind == 'object':
+        return set(values) - {None}, values.count(None)
+
+    if column.validity is None:
+        return set(values), 0
+    bits = column.validity[start >> 3:(end + 7) >> 3]
+    nulls = end - start - bin(int.from_bytes(bits, 'little')).count('1')
+    if not nulls:
+        return set(values), 0
+    return set(compress(values, (bits[i >> 3] >> (i & 7) & 1 for i in range(end - start)))), nulls
+
+
+class ColumnStats:
+    def __init__(self, column, block_rows = STATS_BLOCK_ROWS):
+        self.version = column.version
+        self.rows = len(column)
+        self.block_rows = block_rows
+        self.mins = []      # None when the block has no values or they can't be ordered
+        self.maxs = []
+        self.null_counts = array('q')
+        self.distinct_counts = array('q')
+
+        sketch = set()
+        for start in range(0, self.rows, block_rows):
+            distinct, nulls = _block_values(column, start, min(start + block_rows, self.rows))
+            try:
+                low, high = (min(distinct), max(distinct)) if distinct else (None, None)
+                # A NaN that ends up as the min or max would make every test fail
+                if low != low or high != high:
+                    low = high = None
+            except TypeError:
+                low = high = None
+            self.mins.append(low)
+            self.maxs.append(high)
+            self.null_counts.append(nulls)
+            self.distinct_counts.append(len(distinct))
+            sketch = set(heapq.nsmallest(_SKETCH_VALUES, sketch.union(map(hash, zip(distinct, repeat(_SKETCH_SALT))))))
+        self.sketch = array('q', sorted(sketch))
+
+    def null_count(self):
+        return sum(self.null_counts)
+
+    # Column min/max, or None when some block's values couldn't be ordered
+    def min(self):
+        return self._extreme(self.mins, min)
+
+    def max(self):
+        return self._extreme(self.maxs, max)
+
+    def _extreme(self, values, pick):
+        known = []
+        for b, value in enumerate(values):
+            if value is None and self.null_counts[b] < self._block_length(b):
+                return None
+            if value is not None:
+                known.append(value)
+        try:
+            return pick(known, default = None)
+        except TypeError:
+            return None
+
+    # Exact below _SKETCH_VALUES distinct values, else estimated from how
+    # close together the smallest hashes are
+    def distinct(self):
+        if len(self.sketch) < _SKETCH_VALUES:
+            return len(self.sketch)
+        kth = (self.sketch[-1] + 2 ** 63 + 1) / 2 ** 64
+        return round((_SKETCH_VALUES - 1) / kth)
+
+    def _block_length(self, b):
+        return min(self.block_rows, self.rows - b * self.block_rows)
+
+    # One bool per block: False when no row in the block can satisfy
+    # `value <op> literal` (None rows never match). None if the literal can't
+    # be compared with the block values.
+    def may_match(self, op, literal):
+        if literal is None:
+            return [False] * len(self.mins)
+        tests = {
+            '==': lambda low, high: low <= literal <= high,
+            '<': lambda low, high: low < literal,
+            '<=': lambda low, high: low <= literal,
+            '>': lambda low, high: high > literal,
+            '>=': lambda low, high: high >= literal,
+        }
+        test = tests[op]
+        try:
+            return [self.null_counts[b] < self._block_length(b) and (low is None or test(low, high))
+                    for b, (low, high) in enumerate(zip(self.mins, self.maxs))]
+        except TypeError:
+            return None
+
+
+
+#////////////////////////  Join helpers  /////////////////////////////////////
+# Output columns for a join: every left column, then the right columns minus the
+# right key. Right columns that clash with a left name get a "_right" suffix.
+def _join_columns(left_columns, right_columns, right_key):
+    result_columns = list(left_columns)
+    changed_columns = {}
+
+    for col in right_columns:
+        if col != right_key:
+            # Check for matching columns that isn't key
+            if col in result_columns:
+                changed_columns[col] = f"{col}_right"
+                result_columns.append(f"{col}_right")
+            else:
+                result_columns.append(col)
+
+    return result_columns, changed_columns
+
+
+# Keys to hash join two key columns on. When both are dict columns the left
+# codes are translated into right codes once per distinct string (-2 = not on
+# the right), so the join compares small ints instead of strings.
+def _join_keys(left, right):
+    left_encoded = _dictionary_codes(left)
+    right_encoded = _dictionary_codes(right)
+    if left_encoded is None or right_encoded is None:
+        return left, right
+
+    left_codes, left_base = left_encoded
+    right_codes, right_base = right_encoded
+    translate = [right_base.code_of(value) for value in left_base.dictionary]
+    translate = [-2 if code is None else code for code in translate] + [-1]
+    right_codes = right_codes if isinstance(right_codes, (array, memoryview)) else array('q', right_codes)
+    return array('q', map(translate.__getitem__, left_codes)), right_codes
+
+
+# Bit-array set of join keys with no false negatives: a key that was added is
+# always found, a key that wasn't is found with probability about
+# false_positive_rate. Used by join(..., bloom_filter=True) to throw away rows
+# of the big side that can't match before any hash probe, keeping only a few
+# bits per key of the small side.
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+
+class BloomFilter:
+    def __init__(self, capacity, false_positive_rate = BLOOM_FALSE_POSITIVE_RATE):
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+        self.capacity = capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    # Bit positions come from double hashing one well-mixed 64-bit hash
+    # (hash() of a small int is the int itself, so it goes through a tuple first)
+    def add(self, value):
+        h = hash((value, 0x9E3779B9)) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, h >> 32 | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % size
+            bits[p >> 3] |= 1 << (p & 7)
+
+    # Stops at the first clear bit, so most misses cost one or two lookups
+    def __contains__(self, value):
+        h = hash((value, 0x9E3779B9)) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, h >> 32 | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % size
+            if not bits[p >> 3] >> (p & 7) & 1:
+                return False
+        return True
+
+    # Filter holding every value of a key column (dict columns add each
+    # distinct string once)
+    @classmethod
+    def from_column(cls, column, false_positive_rate = BLOOM_FALSE_POSITIVE_RATE):
+        encoded = _dictionary_codes(column)
+        if encoded is None:
+            keys = column
+        else:
+            codes, base = encoded
+            keys = [base.dictionary[code] if code >= 0 else None for code in set(codes)]
+        bloom = cls(len(keys), false_positive_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    # Rows of column whose value may be in the filter (dict columns test each
+    # distinct string once)
+    def matching_rows(self, column):
+        encoded = _dictionary_codes(column)
+        if encoded is None:
+            return [i for i, value in enumerate(column) if value in self]
+        codes, base = encoded
+        table = [value in self for value in base.dictionary] + [None in self]
+        return list(compress(range(len(column)), map(table.__getitem__, codes)))
+
+
+# Bloom filter for a stream of keys of unknown length (the build side of a
+# grace join): a chain of BloomFilters, each twice as big as the last with
+# half its false positive rate, so the overall rate stays under the target
+class _BloomChain:
+    def __init__(self, false_positive_rate = BLOOM_FALSE_POSITIVE_RATE, capacity = CHUNK_ROWS):
+        self.filters = []
+        self.false_positive_rate = false_positive_rate
+        self.capacity = capacity
+        self.count = 0      # keys in the newest filter
+
+    def add(self, value):
+        if not self.filters or self.count >= self.filters[-1].capacity:
+            k = len(self.filters)
+            self.filters.append(BloomFilter(self.capacity << k, self.false_positive_rate / 2 ** (k + 1)))
+            self.count = 0
+        self.filters[-1].add(value)
+        self.count += 1
+
+    def __contains__(self, value):
+        return any(value in bloom for bloom in self.filters)
+
+
+# Build/probe hash join over two key columns. Returns (left_row, right_row) pairs
+# in left row order, with None standing in for the missing side of outer rows.
+# right_table can be a prebuilt {key: [right rows]} table (from a hash index).
+def _hash_join_pairs(left_keys, right_keys, how = 'inner', right_table = None):
+    pairs = []
+
+    if right_table is not None or len(right_keys) <= len(left_keys):
+        # Build on the right, probe with the left rows in order
+        table = right_table
+        if table is None:
+            table = {}
+            for j, key in enumerate(right_keys):
+                table.setdefault(key, []).append(j)
+
+        matched_right = set()
+        for i, key in enumerate(left_keys):
+            matches = table.get(key)
+            if matches:
+                for j in matches:
+                    pairs.append((i, j))
+                if how in ('right', 'outer'):
+                    matched_right.update(matches)
+            elif how in ('left', 'outer'):
+                pairs.append((i, None))
+    else:
+        # Build on the left, probe with the right rows, then restore left order
+        table = {}
+        for i, key in enumerate(left_keys):
+            table.setdefault(key, []).append(i)
+
+        matched_left = set()
+        matched_right = set()
+        for j, key in enumerate(right_keys):
+            matches = table.get(key)
+            if matches:
+                for i in matches:
+                    pairs.append((i, j))
+                matched_left.update(matches)
+                matched_right.add(j)
+
+        if how in ('left', 'outer'):
+            pairs.extend((i, None) for i in range(len(left_keys)) if i not in matched_left)
+        # Stable sort keeps right rows in order within each left row
+        pairs.sort(key = lambda pair: pair[0])
+
+    # Right rows with no partner go at the end
+    if how in ('right', 'outer'):
+        pairs.extend((None, j) for j in range(len(right_keys)) if j not in matched_right)
+
+    return pairs
+
+
+
+#////////////////////////  Aggregation helpers  /////////////////////////////////////
+# dataFrame.agg keeps one small running state per group instead of a list of
+# row indices: [row_count, [count, total, minimum, maximum] per aggregated column].
+# None values are skipped, like the single-aggregate methods always did.
+AGG_FUNCTIONS = ('sum', 'avg', 'max', 'min', 'count')
+
+
+# Normalizes {'salary': ['sum', 'avg'], '*': 'count'} into [(column, [functions])]
+def _agg_plan(aggs):
+    plan = []
+    for column, functions in aggs.items():
+        functions = [functions] if isinstance(functions, str) else list(functions)
+        for function in functions:
+            if function not in AGG_FUNCTIONS:
+                raise ValueError(f"Unknown aggregate '{function}', expected one of {list(AGG_FUNCTIONS)}")
+        # Each function names one result column, so it can appear once per column
+        if len(set(functions)) != len(functions):
+            raise ValueError(f"Repeated aggregate for column '{column}'")
+        if column == '*' and functions != ['count']:
+            raise ValueError("Only 'count' can be used with '*'")
+        plan.append((column, functions))
+    return plan
+
+
+# Group keys for the rows of the key columns (tuples for several columns).
+# Dict columns contribute their codes, so rows are hashed as small ints;
+# decode (None when nothing was encoded) turns such a key back into values.
+def _group_keys(key_columns):
+    encoded = [_dictionary_codes(column) for column in key_columns]
+    if not any(encoded):
+        return (zip(*key_columns) if len(key_columns) > 1 else key_columns[0]), None
+
+    sources = [column if e is None else e[0] for column, e in zip(key_columns, encoded)]
+    tables = [None if e is None else e[1]._decode_table() for e in encoded]
+    if len(key_columns) == 1:
+        return sources[0], tables[0].__getitem__
+
+    def decode(key):
+        return tuple(part if table is None else table[part] for part, table in zip(key, tables))
+    return zip(*sources), decode
+
+
+# Scans the key and value columns once, updating each group's running state
+# (in groups, when given, to carry on from earlier rows)
+def _agg_partial(group_keys, value_columns, plan, groups = None):
+    groups = {} if groups is None else groups
+    needs_total = [any(f in ('sum', 'avg') for f in functions) for _, functions in plan]
+    needs_min = ['min' in functions for _, functions in plan]
+    needs_max = ['max' in functions for _, functions in plan]
+    width = len(value_columns)
+
+    for key, *values in zip(group_keys, *value_columns):
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = [0] + [[0, 0, None, None] for _ in range(width)]
+        state[0] += 1
+
+        for k in range(width):
+            value = values[k]
+            if value is None:
+                continue
+            running = state[k + 1]
+            running[0] += 1
+            if needs_total[k]:
+                running[1] += value
+            if needs_min[k] and (running[2] is None or value < running[2]):
+                running[2] = value
+            if needs_max[k] and (running[3] is None or value > running[3]):
+                running[3] = value
+
+    return groups
+
+
+# Folds partial state b into a: row_count plus [count, total, min, max] for
+# each of the width aggregated columns (anything after those is left alone)
+def _merge_partial(a, b, width):
+    a[0] += b[0]
+    for k in range(1, width + 1):
+        x, y = a[k], b[k]
+        x[0] += y[0]
+        x[1] += y[1]
+        if y[2] is not None and (x[2] is None or y[2] < x[2]):
+            x[2] = y[2]
+        if y[3] is not None and (x[3] is None or y[3] > x[3]):
+            x[3] = y[3]
+
+
+# Turns the group states into the result dataFrame
+def _agg_finish(groups, by, plan):
+    result_data = {col: [] for col in by}
+    result_columns = list(by)
+    for column, functions in plan:
+        for function in functions:
+            name = 'count' if column == '*' else f'{column}_{function}'
+            result_data[name] = []
+            result_columns.append(name)
+
+    for key, state in groups.items():
+        # Split tuple keys back into their group columns
+        key_parts = key if len(by) > 1 else (key,)
+        for col, part in zip(by, key_parts):
+            result_data[col].append(part)
+
+        for k, (column, functions) in enumerate(plan):
+            count, total, minimum, maximum = state[k + 1]
+            for function in functions:
+                name = 'count' if column == '*' else f'{column}_{function}'
+                if column == '*':
+                    value = state[0]
+                elif function == 'sum':
+                    value = total
+                elif function == 'avg':
+                    value = total / count if count else 0
+                elif function == 'max':
+                    value = maximum
+                elif function == 'min':
+                    value = minimum
                 else:
-                    data[column_name].append(None)
+                    value = count
+                result_data[name].append(value)
+
+    return dataFrame(result_data, result_columns)
+
+
+
+#////////////////////////  Spilling aggregation  /////////////////////////////////////
+# agg(..., memory_budget=bytes) keeps at most about that many bytes of group
+# states. When there are more groups, every state is written to one of
+# SPILL_PARTITIONS temp files picked by the key's hash, and the dictionary
+# starts over. At the end each partition is merged and finished on its own
+# (split again with a different hash if it still doesn't fit). Each state also
+# carries the order its group was first seen in, so the result has the same
+# rows in the same order as the in-memory agg.
+SPILL_PARTITIONS = 64
+SPILL_MIN_GROUPS = 256     # kept in memory whatever the budget, so tiny budgets don't spill every row
+_MAX_SPILL_DEPTH = 8
+
+
+def _state_bytes(key, state):
+    def deep(obj):
+        if isinstance(obj, (list, tuple)):
+            return sys.getsizeof(obj) + sum(map(deep, obj))
+        return sys.getsizeof(obj)
+    # plus the dictionary slot
+    return deep(key) + deep(state) + 100
+
+
+# Folds partial state b into a (row_count, per column [count, total, min, max], first seen)
+def _merge_state(a, b):
+    _merge_partial(a, b, len(a) - 2)
+    a[-1] = min(a[-1], b[-1])
+
+
+def _write_states(groups, partitions, depth, key_width):
+    for key, state in groups.items():
+        parts = key if key_width > 1 else (key,)
+        fields = [_encode_value(part) for part in parts]
+        fields.append(_encode_value(state[0]))
+        for running in state[1:-1]:
+            fields.extend(map(_encode_value, running))
+        fields.append(_encode_value(state[-1]))
+        partitions[hash((depth, key)) % len(partitions)].write("\t".join(fields) + "\n")
+
+
+def _read_states(file, key_width):
+    file.seek(0)
+    for line in file:
+        values = [_decode_value(field) for field in line.rstrip("\n").split("\t")]
+        key = tuple(values[:key_width]) if key_width > 1 else values[0]
+        rest = values[key_width:]
+        state = [rest[0]] + [rest[i:i + 4] for i in range(1, len(rest) - 1, 4)] + [rest[-1]]
+        yield key, state
+
+
+# Merges one partition file and finishes it into (result frame, first seen per row),
+# splitting it into sub-partitions first if its groups exceed max_groups
+def _finish_partition(file, by, plan, max_groups, depth):
+    groups = {}
+    spilled = None
+    for key, state in _read_states(file, len(by)):
+        known = groups.get(key)
+        if known is not None:
+            _merge_state(known, state)
+            continue
+        groups[key] = state
+        if len(groups) > max_groups and depth < _MAX_SPILL_DEPTH:
+            if spilled is None:
+                spilled = [tempfile.TemporaryFile('w+', encoding = 'utf-8', newline = '\n') for _ in range(SPILL_PARTITIONS)]
+            _write_states(groups, spilled, depth + 1, len(by))
+            groups = {}
+
+    if spilled is None:
+        return [(_agg_finish(groups, by, plan), array('q', [state[-1] for state in groups.values()]))]
+
+    try:
+        _write_states(groups, spilled, depth + 1, len(by))
+        del groups
+        finished = []
+        for sub in spilled:
+            finished.extend(_finish_partition(sub, by, plan, max_groups, depth + 1))
+        return finished
+    finally:
+        for sub in spilled:
+            sub.close()
+
+
+def _agg_spilling(key_columns, value_columns, plan, by, memory_budget):
+    n = len(key_columns[0])
+    group_keys = iter(zip(*key_columns) if len(key_columns) > 1 else key_columns[0])
+    value_iters = [iter(column) for column in value_columns]
+    groups = {}
+    partitions = None
+    first_seen = count()
+    max_groups = None
+    chunk_rows = CHUNK_ROWS
+
+    try:
+        start = 0
+        while start < n:
+            known = len(groups)
+            _agg_partial(islice(group_keys, chunk_rows), [islice(it, chunk_rows) for it in value_iters], plan, groups)
+            start += chunk_rows
+
+            # New groups sit at the end of the dictionary, in the order they were first seen
+            for key in reversed(list(islice(reversed(groups), len(groups) - known))):
+                groups[key].append(next(first_seen))
+
+            if max_groups is None and groups:
+                key, state = next(iter(groups.items()))
+                max_groups = max(SPILL_MIN_GROUPS, memory_budget // _state_bytes(key, state))
+                # Smaller steps so the budget is overshot by at most one step
+                chunk_rows = min(CHUNK_ROWS, max_groups)
+
+            if max_groups is not None and len(groups) > max_groups:
+                if partitions is None:
+                    partitions = [tempfile.TemporaryFile('w+', encoding = 'utf-8', newline = '\n')
+                                  for _ in range(SPILL_PARTITIONS)]
+                _write_states(groups, partitions, 0, len(by))
+                groups = {}
+
+        if partitions is None:
+            return _agg_finish(groups, by, plan)
+
+        _write_states(groups, partitions, 0, len(by))
+        del groups
+        finished = []
+        for partition in partitions:
+            finished.extend(_finish_partition(partition, by, plan, max_groups, 0))
+    finally:
+        for partition in partitions or ():
+            partition.close()
+
+    # Back to first-seen order, as the in-memory agg returns it
+    frames = [frame for frame, _ in finished]
+    first_rows = array('q', chain.from_iterable(seen for _, seen in finished))
+    result = _concat_frames(frames, frames[0].column_names)
+    order = sorted(range(len(first_rows)), key = first_rows.__getitem__)
+    return dataFrame({col: result.data[col].take(order) for col in result.column_names}, list(result.column_names))
+
+
+
+#////////////////////////  Parallel aggregation  /////////////////////////////////////
+# agg(..., workers=N) (and sum/avg/min/max/count) cuts the rows into chunks,
+# runs _agg_partial on each chunk in a process pool and folds the partial
+# states together in chunk order, so groups come out in the order they are
+# first seen, like the serial agg. Counts, min and max are exact; float sums
+# are added up per chunk, so they can differ from the serial sum in the last
+# few bits.
+AGG_CHUNK_ROWS = 1 << 20
+
+
+# Standalone copy of rows start:end that pickles cheaply (start a multiple of 8,
+# so the validity bitmap can be sliced bytewise)
+def _row_chunk(column, start, end):
+    if column is None or isinstance(column, ColumnView) or start % 8:
+        return column.take(range(start, end)) if column is not None else None
+    values = column.values[start:end]
+    if isinstance(values, memoryview):
+        values = array(values.format, values.tobytes())
+    validity = column.validity
+    if validity is not None:
+        validity = bytearray(validity[start >> 3:(end + 7) >> 3])
+    return Column(column.kind, values, validity, column.dictionary)
+
+
+# Worker: group states for one chunk, keyed on the decoded group values
+def _agg_chunk(task):
+    key_columns, value_columns, plan = task
+    group_keys, decode = _group_keys(key_columns)
+    value_columns = [column if column is not None else repeat(None) for column in value_columns]
+    groups = _agg_partial(group_keys, value_columns, plan)
+    if decode is not None:
+        groups = {decode(key): state for key, state in groups.items()}
+    return groups
+
+
+def _agg_parallel(key_columns, value_columns, plan, by, workers):
+    rows = len(key_columns[0])
+    # At least one chunk per worker, more for big inputs to keep each one small
+    parts = max(workers, -(-rows // AGG_CHUNK_ROWS))
+    step = (-(-rows // parts) + 7) // 8 * 8
+
+    groups = {}
+    width = len(plan)
+
+    def fold(partial):
+        for key, state in partial.items():
+            merged = groups.get(key)
+            if merged is None:
+                groups[key] = state
+            else:
+                _merge_partial(merged, state, width)
+
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        # Only a couple of chunks per worker are copied out at a time; results
+        # are folded in chunk order
+        pending = deque()
+        for start in range(0, rows, step):
+            end = min(start + step, rows)
+            task = ([_row_chunk(column, start, end) for column in key_columns],
+                    [_row_chunk(column, start, end) for column in value_columns], plan)
+            pending.append(pool.submit(_agg_chunk, task))
+            if len(pending) >= 2 * workers:
+                fold(pending.popleft().result())
+        while pending:
+            fold(pending.popleft().result())
+
+    return _agg_finish(groups, by, plan)
+
+
+
+#////////////////////////  Approximate aggregation  /////////////////////////////////////
+# df.approx_count_distinct(col) counts distinct values with a HyperLogLog
+# sketch: 2**precision one-byte registers, relative error about
+# 1.04 / sqrt(2**precision). Sketches of the same precision merge with |, so
+# chunks or partitions can be counted separately. Value hashes come from
+# hash(), so string sketches only merge within one process (or with a fixed
+# PYTHONHASHSEED).
+#
+# df.approx_avg / df.approx_sum aggregate a uniform sample of sample_rows rows
+# and give normal-approximation confidence bounds; with a table no bigger than
+# the sample they are exact and the bounds equal the estimate.
+HLL_PRECISION = 12
+APPROX_SAMPLE_ROWS = 100000
+
+
+class HyperLogLog:
+    def __init__(self, precision = HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        # hash() itself is too regular (small ints hash to themselves), so
+        # its bits are mixed with the MurmurHash3 finalizer first
+        h = hash(value) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ h >> 33) * 0xFF51AFD7ED558CCD) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ h >> 33) * 0xC4CEB9FE1A85EC53) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 33
+        p = self.precision
+        rest = h & ((1 << (64 - p)) - 1)
+        # Position of the first 1 bit after the p register bits
+        rank = 64 - p - rest.bit_length() + 1
+        j = h >> (64 - p)
+        if rank > self.registers[j]:
+            self.registers[j] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def __or__(self, other):
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        if other.precision != self.precision:
+            raise ValueError("Only sketches with the same precision can be merged")
+        merged = HyperLogLog(self.precision)
+        merged.registers = bytearray(map(max, self.registers, other.registers))
+        return merged
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small cardinalities: linear counting over the empty registers
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    # Sketch of a column's non-None values. Every distinct value only needs
+    # adding once, so values are deduplicated a chunk at a time first (dict
+    # columns just add the strings their codes use).
+    @classmethod
+    def from_column(cls, column, precision = HLL_PRECISION):
+        sketch = cls(precision)
+        encoded = _dictionary_codes(column)
+        if encoded is not None:
+            codes, base = encoded
+            used = set(codes)
+            used.discard(-1)
+            sketch.update(base.dictionary[code] for code in used)
+            return sketch
+
+        values = iter(column)
+        while True:
+            chunk = set(islice(values, CHUNK_ROWS))
+            if not chunk:
+                return sketch
+            chunk.discard(None)
+            sketch.update(chunk)
+
+
+# Estimates and confidence bounds per group from a sample of rows, as
+# [(key, estimate, low, high, sampled rows)] (tuple keys for several columns)
+def _approx_groups(key_columns, value_column, function, rows, population, confidence):
+    key_views = [column.view(rows) for column in key_columns]
+    group_keys = zip(*key_views) if len(key_views) > 1 else key_views[0]
+
+    # [non-None count, total, total of squares, sampled rows] per group
+    groups = {}
+    for key, value in zip(group_keys, value_column.view(rows)):
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = [0, 0, 0, 0]
+        state[3] += 1
+        if value is not None:
+            state[0] += 1
+            state[1] += value
+            state[2] += value * value
+
+    n = len(rows)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    # Finite population correction: no uncertainty left once every row is sampled
+    fpc = math.sqrt(1 - n / population)
+
+    results = []
+    for key, (count, total, squares, sampled) in groups.items():
+        if function == 'avg':
+            estimate = total / count if count else 0
+            spread = None
+            if count > 1:
+                spread = math.sqrt(max(0, (squares - total * total / count) / (count - 1)) / count)
+            elif count and not fpc:
+                spread = 0
+        else:
+            # Scaled-up sample sum; rows outside the group count as 0
+            estimate = total if n == population else total * population / n
+            spread = population * math.sqrt(max(0, (squares - total * total / n) / (n - 1)) / n) if n > 1 else 0
+        if spread is None:
+            results.append((key, estimate, None, None, sampled))
+        else:
+            half = z * spread * fpc
+            results.append((key, estimate, estimate - half, estimate + half, sampled))
+    return results
+
+
+
+#////////////////////////  Grace hash join  /////////////////////////////////////
+# Join for inputs that don't fit in memory. Both sides are read a chunk at a
+# time and every row is written to one of `partitions` temp files per side,
+# picked by the hash of its join key. Equal keys always land in the same
+# partition, so each pair of partition files is then joined on its own with
+# the in-memory hash join and yielded as one dataFrame. Only one chunk (while
+# partitioning) or one partition pair and its output (while joining) is held
+# at a time. Rows come out partition by partition, not in left-row order.
+JOIN_CELL_BYTES = 64        # rough memory per cell of a partition being joined
+_MAX_JOIN_PARTITIONS = 256  # two temp files are open per partition
+
+
+# A join input as dataFrame chunks: a CSV path is streamed with iter_csv
+def _join_chunks(source, chunk_rows):
+    if isinstance(source, str):
+        return iter_csv(source, chunk_rows = chunk_rows)
+    if isinstance(source, dataFrame):
+        return iter([source])
+    return iter(source)
+
+
+# Writes each row to the partition file picked by its key. Keys are added to
+# bloom when given; with only, rows whose key isn't in that filter are dropped.
+def _partition_rows(source, key, partitions, side, chunk_rows, bloom = None, only = None):
+    files = [tempfile.TemporaryFile('w+', encoding = 'utf-8', newline = '\n') for _ in range(partitions)]
+    names = None
+    try:
+        for chunk in _join_chunks(source, chunk_rows):
+            if names is None:
+                names = list(chunk.column_names)
+                if key not in names:
+                    raise KeyError(f"{side} key '{key}' not found in {side.lower()} DataFrame!")
+                position = names.index(key)
+            if bloom is not None:
+                for value in chunk.data[key]:
+                    bloom.add(value)
+            rows = zip(*(chunk.data[col] for col in names))
+            if only is not None:
+                rows = (row for row in rows if row[position] in only)
+            for row in rows:
+                files[hash(row[position]) % partitions].write("\t".join(map(_encode_value, row)) + "\n")
+        if names is None:
+            raise ValueError(f"{side} input has no data!")
+    except BaseException:
+        for file in files:
+            file.close()
+        raise
+    return names, files
+
+
+def _read_partition(file, names):
+    file.seek(0)
+    columns = [[] for _ in names]
+    for line in file:
+        for column, field in zip(columns, line.rstrip("\n").split("\t")):
+            column.append(_decode_value(field))
+    return dataFrame(dict(zip(names, columns)), list(names))
+
+
+# Streams the join of left and right (dataFrames, CSV paths or iterables of
+# dataFrame chunks such as iter_csv(...)) as one dataFrame per partition.
+# CSV paths are read chunk_rows rows at a time. With bloom_filter=True (inner
+# and right joins) the right side is partitioned first while its keys go into
+# a Bloom filter, and left rows whose key can't be on the right are never
+# written to disk.
+def iter_join(left, right, left_key, right_key, how = 'inner', partitions = SPILL_PARTITIONS, chunk_rows = CHUNK_ROWS,
+              bloom_filter = False):
+    if how not in ('inner', 'left', 'right', 'outer'):
+        raise ValueError("Join type must be 'inner', 'left', 'right' or 'outer'")
+    if not 1 <= partitions <= _MAX_JOIN_PARTITIONS:
+        raise ValueError(f"partitions must be between 1 and {_MAX_JOIN_PARTITIONS}")
+    return _grace_join(left, right, left_key, right_key, how, partitions, chunk_rows, bloom_filter)
+
+
+def _grace_join(left, right, left_key, right_key, how, partitions, chunk_rows, bloom_filter = False):
+    if bloom_filter and how in ('inner', 'right'):
+        bloom = _BloomChain(capacity = chunk_rows)
+        right_names, right_files = _partition_rows(right, right_key, partitions, 'Right', chunk_rows, bloom = bloom)
+        try:
+            left_names, left_files = _partition_rows(left, left_key, partitions, 'Left', chunk_rows, only = bloom)
+        except BaseException:
+            for file in right_files:
+                file.close()
+            raise
+    else:
+        left_names, left_files = _partition_rows(left, left_key, partitions, 'Left', chunk_rows)
+        try:
+            right_names, right_files = _partition_rows(right, right_key, partitions, 'Right', chunk_rows)
+        except BaseException:
+            for file in left_files:
+                file.close()
+            raise
+
+    keep_left = how in ('left', 'outer')
+    keep_right = how in ('right', 'outer')
+    try:
+        for left_file, right_file in zip(left_files, right_files):
+            left_part = _read_partition(left_file, left_names)
+            right_part = _read_partition(right_file, right_names)
+            # Nothing can come out of this partition pair
+            if not (left_part.shape[0] and right_part.shape[0]) and \
+               not (keep_left and left_part.shape[0]) and not (keep_right and right_part.shape[0]):
+                continue
+            yield left_part._join(right_part, left_key, right_key, how)
+    finally:
+        for file in left_files + right_files:
+            file.close()
 
 
-            
-    return data, column_names
+
+#////////////////////////  Sorting helpers  /////////////////////////////////////
+# dataFrame.order_by sorts row numbers by a key built from the sort columns.
+# Nulls sort last in either direction. With a limit only the best k rows are
+# kept in a bounded heap (heapq.nsmallest, O(n log k)). Without one, keys for
+# at most memory_budget bytes are held at a time: each sorted run is spilled to
+# a temp file as row numbers and the runs are merged, recomputing the keys from
+# the columns, so only one row per run is in memory during the merge.
+SORT_MEMORY_BYTES = 64 * 1024 * 1024
+SPILL_BLOCK_ROWS = 65536
+SORT_MERGE_FANIN = 64      # runs merged at once; more are merged in several passes
+
+
+# Wraps a value so it sorts in reverse (for descending non-numeric columns)
+class _Descending:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+# Function from a row's sort values to its key; None gives (1, 0) so it sorts last
+def _sort_key_function(kinds, ascending):
+    parts = []
+    for kind, up in zip(kinds, ascending):
+        if up:
+            parts.append(lambda v: (1, 0) if v is None else (0, v))
+        elif kind in _TYPECODES:
+            parts.append(lambda v: (1, 0) if v is None else (0, -v))
+        else:
+            parts.append(lambda v: (1, 0) if v is None else (0, _Descending(v)))
+
+    if len(parts) == 1:
+        part = parts[0]
+        return lambda values: part(values[0])
+    return lambda values: tuple(part(v) for part, v in zip(parts, values))
+
+
+# Rough bytes held per (key, row) entry while a run is being sorted
+def _sort_entry_bytes(key):
+    def deep(obj):
+        if isinstance(obj, tuple):
+            return sys.getsizeof(obj) + sum(map(deep, obj))
+        if isinstance(obj, _Descending):
+            return sys.getsizeof(obj) + deep(obj.value)
+        return sys.getsizeof(obj)
+    # the entry tuple, the row number and the run list slot
+    return deep(key) + 64 + 28 + 8
+
+
+def _read_run(file):
+    file.seek(0)
+    while True:
+        block = array('q')
+        try:
+            block.fromfile(file, SPILL_BLOCK_ROWS)
+        except EOFError:
+            # fromfile keeps the items it did read
+            pass
+        if not block:
+            return
+        yield from block
+
+
+# Row numbers of columns in sorted order (stable: ties keep their row order)
+def _sort_rows(columns, ascending, limit = None, memory_budget = SORT_MEMORY_BYTES):
+    make_key = _sort_key_function([column.kind for column in columns], ascending)
+    rows = enumerate(zip(*columns))
+
+    if limit is not None:
+        best = heapq.nsmallest(limit, rows, key = lambda entry: make_key(entry[1]))
+        return array('q', [row for row, _ in best])
+
+    first = next(rows, None)
+    if first is None:
+        return array('q')
+    run_rows = max(1, memory_budget // _sort_entry_bytes(make_key(first[1])))
+    rows = chain([first], rows)
+
+    runs = []
+    try:
+        while True:
+            run = [(make_key(values), row) for row, values in islice(rows, run_rows)]
+            run.sort(key = operator.itemgetter(0))
+            order = array('q', [row for _, row in run])
+            del run
+            if not runs and len(order) < run_rows:
+                # Everything fit in one run, nothing to spill
+                return order
+            if not order:
+                break
+            spill = tempfile.TemporaryFile()
+            order.tofile(spill)
+            runs.append(spill)
+
+        # Runs hold consecutive row ranges and heapq.merge prefers earlier runs
+        # on ties, so merging neighbouring runs keeps the sort stable
+        def row_key(row):
+            return make_key([column[row] for column in columns])
+
+        def merged(group):
+            return heapq.merge(*[_read_run(spill) for spill in group], key = row_key)
+
+        while len(runs) > SORT_MERGE_FANIN:
+            next_runs = []
+            for i in range(0, len(runs), SORT_MERGE_FANIN):
+                group = runs[i:i + SORT_MERGE_FANIN]
+                spill = tempfile.TemporaryFile()
+                next_runs.append(spill)
+                rows = merged(group)
+                while True:
+                    block = array('q', islice(rows, SPILL_BLOCK_ROWS))
+                    if not block:
+                        break
+                    block.tofile(spill)
+                for old in group:
+                    old.close()
+            runs = next_runs
+
+        return array('q', merged(runs))
+    finally:
+        for spill in runs:
+            spill.close()
+
+
+
+#////////////////////////  Profiling  /////////////////////////////////////
+# Opt-in, EXPLAIN ANALYZE style stats. While profiling is on, each dataFrame
+# operation records its wall time, input and output row counts and the peak
+# bytes it allocated (tracemalloc, which slows everything down while it runs),
+# and the result keeps that record, so df.explain(analyze=True) can show the
+# chain of operations that built it. Calls made inside another operation
+# (agg inside sum, where inside a CSV scan) count towards the outer one.
+# When profiling is off an operation only pays for one flag check.
+# set_profiling() turns it on for the whole process; profiling() only for the
+# calling thread (e.g. one Streamlit session), so concurrent sessions don't
+# switch each other's profiling. tracemalloc runs while anyone profiles and
+# is shared, so peaks overlap when several threads profile at once.
+_PROFILING = False
+_STARTED_TRACEMALLOC = False
+_TRACEMALLOC_USERS = 0
+_TRACEMALLOC_LOCK = threading.Lock()
+
+
+class _ProfileState(threading.local):
+    enabled = False     # inside profiling() on this thread
+    depth = 0           # profiled operations running on this thread
+
+
+_PROFILE_STATE = _ProfileState()
+
+
+class OperatorProfile:
+    def __init__(self, operation, inputs):
+        self.operation = operation      # e.g. "join('player_id', 'id')"
+        self.inputs = inputs            # OperatorProfile per input, or its shape if it wasn't profiled
+        self.input_rows = [i.output_rows if isinstance(i, OperatorProfile) else i[0] for i in inputs]
+        self.output_rows = None
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+
+# Counts the users of tracemalloc, starting it for the first and stopping it
+# (unless someone else had started it) after the last
+def _use_tracemalloc(change):
+    global _TRACEMALLOC_USERS, _STARTED_TRACEMALLOC
+    with _TRACEMALLOC_LOCK:
+        _TRACEMALLOC_USERS += change
+        if _TRACEMALLOC_USERS and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _STARTED_TRACEMALLOC = True
+        elif not _TRACEMALLOC_USERS and _STARTED_TRACEMALLOC:
+            tracemalloc.stop()
+            _STARTED_TRACEMALLOC = False
+
+
+def set_profiling(enabled):
+    global _PROFILING
+    enabled = bool(enabled)
+    if enabled != _PROFILING:
+        _PROFILING = enabled
+        _use_tracemalloc(1 if enabled else -1)
+
+
+# with profiling(): ... profiles only the operations inside the block, on
+# this thread
+@contextmanager
+def profiling():
+    state = _PROFILE_STATE
+    if state.enabled:
+        yield
+        return
+    _use_tracemalloc(1)
+    state.enabled = True
+    try:
+        yield
+    finally:
+        state.enabled = False
+        _use_tracemalloc(-1)
+
+
+def _describe_argument(value):
+    if isinstance(value, dataFrame):
+        return f"<dataFrame {value.shape[0]}x{value.shape[1]}>"
+    if callable(value) and not isinstance(value, Expr):
+        return "<function>"
+    return repr(value)
+
+
+# Wraps an operation so it is recorded while profiling is on. self is either
+# a dataFrame or a plan node (described by its describe() text).
+def _profiled(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        state = _PROFILE_STATE
+        if not (_PROFILING or state.enabled) or state.depth:
+            return method(self, *args, **kwargs)
+
+        if isinstance(self, dataFrame):
+            arguments = [_describe_argument(a) for a in args] + [f"{k}={_describe_argument(v)}" for k, v in kwargs.items()]
+            operation = f"{method.__name__}({', '.join(arguments)})"
+        else:
+            operation = self.describe()
+        frames = [f for f in chain([self], args, kwargs.values()) if isinstance(f, dataFrame)]
+        record = OperatorProfile(operation, [f._profile or f.shape for f in frames])
+
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        state.depth += 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            state.depth -= 1
+        record.seconds = time.perf_counter() - start
+        record.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - start_bytes)
+
+        if isinstance(result, dataFrame):
+            record.output_rows = result.shape[0]
+            result._profile = record
+        return result
+    return wrapper
+
+
+def _format_bytes(n):
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
 
 
 
 # ////////////////////////  Dataframe class  /////////////////////////////////////
+# Rows handed out per page by page() and read per step by iter_lines()
+PAGE_ROWS = 1000
+
 class dataFrame:
 
     #Initalizing dataframe
     def __init__(self, data, column_names = None):
-        self.data = data
+        if column_names is None:
+            column_names = list(data)
+
+        # Every column is stored as a Column (typed array where possible)
+        self.data = {col: Column.from_values(data[col]) for col in column_names}
         self.column_names = column_names
+        self._indexes = {}
+        self._profile = None    # OperatorProfile of the operation that built this frame (profiling only)
         self.shape = (len(data[self.column_names[0]]) if self.column_names else 0, len(self.column_names))
 
 
+    # Standalone copy: every view is materialized into its own column
+    def copy(self):
+        return dataFrame({col: self.data[col].materialize() for col in self.column_names}, list(self.column_names))
+
+
+    # Approximate memory held by the columns (views count only their selections)
+    def nbytes(self):
+        return sum(self.data[col].nbytes() for col in self.column_names)
+
+
+    #////////////////////   Result cache   /////////////////////////////////////
+    # Identifies the contents of the given columns (all of them by default)
+    def fingerprint(self, columns = None):
+        columns = self.column_names if columns is None else columns
+        return tuple((col, self.data[col].fingerprint()) for col in columns)
+
+
+    # Cached result for key, or compute() stored under it. Callers get views of
+    # the cached columns, so writing to a result never changes the cache.
+    @staticmethod
+    def _cached(key, compute):
+        result = RESULT_CACHE.get(key)
+        if result is None:
+            result = compute()
+            RESULT_CACHE.put(key, result)
+        return dataFrame({col: _alias(result.data[col]) for col in result.column_names}, list(result.column_names))
+
+
+    #////////////////////   Columnar snapshots   /////////////////////////////////////
+    def save_columnar(self, path):
+        _save_columnar(self, path)
+
+
+    @staticmethod
+    def load_columnar(path):
+        return _load_columnar(path)
+
+
+    # Lazy version of this dataFrame: operations build a plan, collect() runs it
+    def lazy(self):
+        return LazyFrame(_Scan(self))
+
+
+    # Tree of the operations that built this frame (recorded while profiling
+    # was on). analyze=True adds rows in -> out, time and peak bytes per step.
+    def explain(self, analyze = False):
+        lines = []
+        total = 0.0
+
+        def walk(node, depth):
+            nonlocal total
+            indent = "  " * depth
+            if not isinstance(node, OperatorProfile):
+                lines.append(f"{indent}Scan dataFrame ({node[0]} rows, {node[1]} columns)")
+                return
+            text = indent + node.operation
+            if analyze:
+                rows_in = " + ".join(map(str, node.input_rows)) or "-"
+                text += f"  [rows {rows_in} -> {node.output_rows}, {node.seconds * 1000:.2f} ms, " \
+                        f"peak {_format_bytes(node.peak_bytes)}]"
+                total += node.seconds
+            lines.append(text)
+            for child in node.inputs:
+                walk(child, depth + 1)
+
+        walk(self._profile or self.shape, 0)
+        if analyze:
+            if self._profile is None:
+                lines.append("(no operator stats: build the frame inside profiling() or after set_profiling(True))")
+            else:
+                lines.append(f"Total: {total * 1000:.2f} ms")
+        return "\n".join(lines)
+
+
+    #////////////////////   Indexes   /////////////////////////////////////
+    def create_index(self, col, kind = 'hash'):
+        if col not in self.column_names:
+            raise KeyError(f"Column '{col}' not found!")
+        if kind not in _INDEX_KINDS:
+            raise ValueError(f"Index kind must be one of {list(_INDEX_KINDS)}")
+
+        self._indexes.setdefault(col, {})[kind] = _INDEX_KINDS[kind](self.data[col])
+        return self
+
+
+    def drop_index(self, col, kind = None):
+        if kind is None:
+            self._indexes.pop(col, None)
+        else:
+            self._indexes.get(col, {}).pop(kind, None)
+
+
+    # Index of that kind on col, rebuilt first if the column changed since
+    def get_index(self, col, kind = 'hash'):
+        index = self._indexes.get(col, {}).get(kind)
+        if index is None:
+            return None
+
+        # A select() view of the indexed column still matches it row for row
+        column = self.data[col]
+        if isinstance(column, ColumnView) and column.selection is None:
+            column = column.base
+        if index.column is not column or index.version != column.version:
+            index = self._indexes[col][kind] = _INDEX_KINDS[kind](column)
+        return index
+
+
+    # Rows matching one indexed comparison, or None if no index applies
+    def _index_lookup(self, expr):
+        if not (isinstance(expr, Compare) and isinstance(expr.left, Col) and isinstance(expr.right, Lit)):
+            return None
+        name, op, value = expr.left.name, expr.op, expr.right.value
+        if value is None:
+            return None
+
+        if op == '==':
+            index = self.get_index(name, 'hash') or self.get_index(name, 'sorted')
+            return index.lookup(value) if index is not None else None
+
+        index = self.get_index(name, 'sorted')
+        if index is None:
+            return None
+        if op == '>':
+            return index.range(low = value, low_inclusive = False)
+        if op == '>=':
+            return index.range(low = value)
+        if op == '<':
+            return index.range(high = value, high_inclusive = False)
+        if op == '<=':
+            return index.range(high = value)
+        return None
+
+
+    # Answers an expression from an index when one of its & parts is indexed;
+    # the other parts are only checked on the rows the index returned
+    def _index_where(self, condition):
+        conjuncts = _conjuncts(condition)
+        # Equality lookups first, they are usually the most selective
+        conjuncts.sort(key = lambda c: not (isinstance(c, Compare) and c.op == '=='))
+
+        for k, conjunct in enumerate(conjuncts):
+            rows = self._index_lookup(conjunct)
+            if rows is not None:
+                break
+        else:
+            return None
+
+        rest = conjuncts[:k] + conjuncts[k + 1:]
+        if rest and rows:
+            # Drop the index rows in blocks the other parts rule out
+            zones = self._zone_blocks(rest)
+            if zones is not None:
+                block_rows, blocks = zones
+                blocks = set(blocks)
+                rows = [i for i in rows if i // block_rows in blocks]
+            remaining = _conjunction(rest)
+            names = [name for name in self.column_names if name in remaining.columns()]
+            if not names:
+                return None
+            subset = dataFrame({name: self.data[name].view(rows) for name in names}, names)
+            rows = list(compress(rows, remaining.mask(subset)))
+        return rows
+
+
+    # Block stats of a column, built on first use and kept on the column until
+    # it is written to. Views of a subset of rows can't use their base
+    # column's stats: they get None, or with build_views=True stats of their
+    # own rows (not kept).
+    def _column_stats(self, name, build_views = False):
+        column = self.data[name]
+        if isinstance(column, ColumnView):
+            if column.selection is not None:
+                return ColumnStats(column.materialize()) if build_views else None
+            column = column.base
+        if column.stats is None or column.stats.version != column.version:
+            column.stats = ColumnStats(column)
+        return column.stats
+
+
+    # (block_rows, [blocks]) that can hold rows passing every `col(...) <op>
+    # value` part of conjuncts, or None if the stats rule out no block
+    def _zone_blocks(self, conjuncts):
+        keep = None
+        block_rows = None
+        for conjunct in conjuncts:
+            if not (isinstance(conjunct, Compare) and conjunct.op in _ZONE_OPS
+                    and isinstance(conjunct.left, Col) and isinstance(conjunct.right, Lit)):
+                continue
+            stats = self._column_stats(conjunct.left.name)
+            if stats is None or block_rows not in (None, stats.block_rows):
+                continue
+            may_match = stats.may_match(conjunct.op, conjunct.right.value)
+            if may_match is None:
+                continue
+            block_rows = stats.block_rows
+            keep = may_match if keep is None else list(map(operator.and_, keep, may_match))
+
+        if keep is None or all(keep):
+            return None
+        return block_rows, list(compress(range(len(keep)), keep))
+
+
+    # Rows of the blocks left after _zone_blocks, or None if none were ruled out
+    def _zone_rows(self, conjuncts):
+        zones = self._zone_blocks(conjuncts)
+        if zones is None:
+            return None
+        block_rows, blocks = zones
+        rows = array('q')
+        for b in blocks:
+            rows.extend(range(b * block_rows, min((b + 1) * block_rows, self.shape[0])))
+        return rows
+
+
+    # Evaluates an expression on the blocks its stats don't rule out only
+    def _zone_where(self, condition):
+        rows = self._zone_rows(_conjuncts(condition))
+        if rows is None:
+            return None
+        if not rows:
+            return []
+        names = [name for name in self.column_names if name in condition.columns()]
+        subset = dataFrame({name: self.data[name].view(rows) for name in names}, names)
+        return list(compress(rows, condition.mask(subset)))
+
+
+    # Column profiles: one row per column with its kind, null count, min, max,
+    # approximate distinct count and number of stat blocks. Columns without
+    # stats yet are profiled now.
+    def stats(self):
+        names = ['column', 'kind', 'rows', 'nulls', 'min', 'max', 'distinct', 'blocks']
+        result = {name: [] for name in names}
+        for name in self.column_names:
+            stats = self._column_stats(name, build_views = True)
+            result['column'].append(name)
+            result['kind'].append(self.data[name].kind)
+            result['rows'].append(stats.rows)
+            result['nulls'].append(stats.null_count())
+            result['min'].append(stats.min())
+            result['max'].append(stats.max())
+            result['distinct'].append(stats.distinct())
+            result['blocks'].append(len(stats.mins))
+        return dataFrame(result, names)
+
+
     #Getting a column from the dataframe
     def __getitem__(self, key):
         if key in self.data:
@@ -96,23 +2895,8 @@ class dataFrame:
         if not self.column_names:
             return "Empty DataFrame"
         
-        # Create a simple table representation
-        result = []
-        
-        # Header row(limit to first 5 columns)
-        header_row = " | ".join(f"{h:<20}" for h in self.column_names[:5])  
-        result.append(header_row)
-        result.append("-" * len(header_row))
-        
-        # Data rows (first 10 rows)
-        num_rows = min(10, self.shape[0])
-        for i in range(num_rows):
-            row_data = []
-            # Limit first 5 columns
-            for header in self.column_names[:5]:  
-                value = str(self.data[header][i])
-                row_data.append(f"{value:<20}")
-            result.append(" | ".join(row_data))
+        # Create a simple table representation (first 5 columns, first 10 rows)
+        result = list(self.iter_lines(self.column_names[:5], limit = 10, footer = False))
         
         if self.shape[0] > 10:
             result.append(f"... ({self.shape[0] - 10} more rows)")
@@ -122,59 +2906,125 @@ class dataFrame:
     
 
 
+    #////////////////////   Paging   /////////////////////////////////////
+    # Rows offset .. offset + limit - 1 of the given columns (default all) as
+    # views, so only that slice is ever touched
+    def page(self, offset = 0, limit = PAGE_ROWS, columns = None):
+        columns = self.column_names if columns is None else list(columns)
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit must not be negative")
+        for col in columns:
+            if col not in self.column_names:
+                raise KeyError(f"Column '{col}' doesn't exist!")
+
+        rows = range(min(offset, self.shape[0]), min(offset + limit, self.shape[0]))
+        return dataFrame(_view_columns({col: self.data[col] for col in columns}, rows), columns)
+
+
+    # Yields the table one formatted line at a time (header, rule, rows, shape),
+    # reading PAGE_ROWS rows at a time instead of building one big string
+    def iter_lines(self, columns = None, offset = 0, limit = None, width = 20, footer = True):
+        columns = self.column_names if columns is None else list(columns)
+        stop = self.shape[0] if limit is None else min(offset + limit, self.shape[0])
+
+        header_row = " | ".join(f"{h:<{width}}" for h in columns)
+        yield header_row
+        yield "-" * len(header_row)
+
+        for start in range(offset, stop, PAGE_ROWS):
+            page = self.page(start, min(PAGE_ROWS, stop - start), columns)
+            for row in zip(*(page.data[col] for col in columns)):
+                yield " | ".join(f"{str(value):<{width}}" for value in row)
+
+        if footer:
+            yield ""
+            yield f"DataFrame Shape: {self.shape}"
+
+
+
     # #////////////////////   Select function aka projection   /////////////////////////////////////
+    @_profiled
     def select(self, columns):
         # Validate that requested columns exist
         for col in columns:
             if col not in self.column_names:
                 raise KeyError(f"Column '{col}' doesn't exist!")
         
-        # New data dictionary with only selected columns
+        # New data dictionary with views of the selected columns (no copying)
         new_data = {}
         for col in columns:
-            new_data[col] = self.data[col]
+            new_data[col] = _alias(self.data[col])
         
-        # Return new dataFrame
-        return dataFrame(new_data, columns)
+        # Same rows, so indexes on the kept columns still apply
+        result = dataFrame(new_data, columns)
+        result._indexes = {col: dict(self._indexes[col]) for col in columns if col in self._indexes}
+        return result
     
 
 
     # #////////////////////   Where function aka filtering   /////////////////////////////////////
+    @_profiled
     def where(self, condition):
         if not self.column_names or self.shape[0] == 0:
             return dataFrame({}, [])
     
         # Determine which rows to keep
-        rows_to_keep = []
-        
-        for i in range(self.shape[0]):
-            # Build a row dictionary for this index
-            row = {col: self.data[col][i] for col in self.column_names}
-            
-            # Check condition
-            if callable(condition):
-                # If condition is a function, call it with the row
-                if condition(row):
-                    rows_to_keep.append(i)
-            elif isinstance(condition, dict):
-                # If condition is a dict, check all key-value pairs match
-                match = True
-                for col, val in condition.items():
-                    if col not in self.data:
-                        raise KeyError(f"Column '{col}' not found!")
-                    if self.data[col][i] != val:
-                        match = False
-                        break
-                if match:
-                    rows_to_keep.append(i)
+        if isinstance(condition, Expr):
+            # Column expression: evaluate into a mask a column at a time
+            if not hasattr(condition, 'mask'):
+                raise ValueError("Expression must be a comparison, e.g. col('age') > 30")
+            for name in condition.columns():
+                if name not in self.data:
+                    raise KeyError(f"Column '{name}' not found!")
+            rows_to_keep = self._index_where(condition)
+            if rows_to_keep is None:
+                rows_to_keep = self._zone_where(condition)
+            if rows_to_keep is None:
+                rows_to_keep = list(compress(range(self.shape[0]), condition.mask(self)))
+        elif callable(condition):
+            # If condition is a function, call it with each row as a dictionary
+            names = self.column_names
+            columns = [self.data[col] for col in names]
+            rows_to_keep = [i for i, values in enumerate(zip(*columns)) if condition(dict(zip(names, values)))]
+        elif isinstance(condition, dict):
+            for col in condition:
+                if col not in self.data:
+                    raise KeyError(f"Column '{col}' not found!")
+
+            # If condition is a dict, narrow the rows one column at a time,
+            # starting from an index lookup when one of the columns has one
+            rows_to_keep = None
+            for col, val in condition.items():
+                index = self.get_index(col, 'hash') or (self.get_index(col, 'sorted') if val is not None else None)
+                if index is not None:
+                    rows_to_keep = index.lookup(val)
+                    break
             else:
-                raise ValueError("Condition must be a function or dictionary")
-        
-        # Build new data with only the rows we're keeping
-        new_data = {}
-        for col in self.column_names:
-            new_data[col] = [self.data[col][i] for i in rows_to_keep]
-        
+                # Otherwise only the blocks whose stats can hold the values (None
+                # values match here, unlike in expressions, so they can't use stats)
+                zone_rows = self._zone_rows([Compare('==', Col(col), Lit(val))
+                                             for col, val in condition.items() if val is not None])
+                if zone_rows is not None:
+                    rows_to_keep = list(zone_rows)
+            for col, val in condition.items():
+                column = self.data[col]
+                encoded = _dictionary_codes(column) if rows_to_keep is None else None
+                if encoded is not None:
+                    # Dict columns are scanned for the string's code
+                    codes, base = encoded
+                    code = base.code_of(val)
+                    rows_to_keep = [i for i, c in enumerate(codes) if c == code]
+                elif rows_to_keep is None:
+                    rows_to_keep = [i for i, value in enumerate(column) if value == val]
+                else:
+                    rows_to_keep = [i for i in rows_to_keep if column[i] == val]
+            if rows_to_keep is None:
+                rows_to_keep = list(range(self.shape[0]))
+        else:
+            raise ValueError("Condition must be a function, dictionary or column expression")
+
+        # Views of the rows we're keeping; nothing is copied until it's written to
+        new_data = _view_columns(self.data, rows_to_keep)
         return dataFrame(new_data, self.column_names)
 
 
@@ -192,231 +3042,646 @@ class dataFrame:
     # Create groups
         groups = {}
     
-        for i in range(self.shape[0]):
-            # Create group key from values in group columns
-            key_parts = []
-            for col in columns:
-                key_parts.append(self.data[col][i])
-            
-            # Use tuple as key (hashable)
-            group_key = tuple(key_parts) if len(key_parts) > 1 else key_parts[0]
-            
+        key_columns = [self.data[col] for col in columns]
+        # Use tuple as key (hashable) when grouping on several columns
+        group_keys, decode = _group_keys(key_columns)
+
+        for i, group_key in enumerate(group_keys):
             # Add row index to this group
             if group_key not in groups:
                 groups[group_key] = []
             groups[group_key].append(i)
-        
+
+        # Dict columns were grouped on their codes
+        if decode is not None:
+            groups = {decode(key): rows for key, rows in groups.items()}
         return groups
 
 
     
     ##////////////////////   Aggregation functions   /////////////////////////////////////
-    def avg(self, group_column, average_column):
-        #Grouping
-        groups = self.group_by(group_column)
+    # Several aggregates over one grouping in a single scan, e.g.
+    # df.agg(by=['position'], aggs={'salary': ['sum', 'avg', 'max'], 'points_per_game': ['min']})
+    # Result columns are named '<column>_<function>' ('count' for '*').
+    # With memory_budget=bytes the group states are kept under that budget and
+    # spilled to disk in hash partitions when there are too many groups.
+    # With workers=N the rows are aggregated in chunks across N processes
+    # (ignored when memory_budget is set).
+    @_profiled
+    def agg(self, by, aggs, memory_budget = None, workers = None):
+        by = [by] if isinstance(by, str) else list(by)
+        if not by:
+            raise ValueError("agg needs at least one group column")
+        plan = _agg_plan(aggs)
+
+        # Validate columns exist
+        for col in by + [column for column, _ in plan if column != '*']:
+            if col not in self.column_names:
+                raise KeyError(f"Column '{col}' not found!")
 
-        result_data = {
-            group_column: [],
-            f'{average_column}_avg': []
-        }
+        def compute():
+            key_columns = [self.data[col] for col in by]
+            value_columns = [self.data[column] if column != '*' else repeat(None) for column, _ in plan]
+            if memory_budget is not None:
+                return _agg_spilling(key_columns, value_columns, plan, by, memory_budget)
+            if workers is not None and workers > 1 and self.shape[0]:
+                value_columns = [self.data[column] if column != '*' else None for column, _ in plan]
+                return _agg_parallel(key_columns, value_columns, plan, by, workers)
 
-        for group_key, row_indices in groups.items():
-            result_data[group_column].append(group_key)
+            # Use tuple as key (hashable) when grouping on several columns
+            group_keys, decode = _group_keys(key_columns)
+            groups = _agg_partial(group_keys, value_columns, plan)
+            if decode is not None:
+                groups = {decode(key): state for key, state in groups.items()}
+            return _agg_finish(groups, by, plan)
 
-            #Getting the values to average
-            values = [self.data[average_column][i] for i in row_indices]
-            values = [i for i in values if i is not None]
+        # Only the columns read matter, so unrelated columns can change freely
+        used = by + [column for column, _ in plan if column != '*' and column not in by]
+        key = ('agg', self.fingerprint(used), tuple(by), tuple((column, tuple(functions)) for column, functions in plan))
+        return self._cached(key, compute)
 
-            # Taking the average of the values
-            avg_val = sum(values) / len(values) if values else 0
-            result_data[f'{average_column}_avg'].append(avg_val)
-    
-        return dataFrame(result_data, [group_column, f'{average_column}_avg'])
 
+    @_profiled
+    def avg(self, group_column, average_column, workers = None):
+        return self.agg(group_column, {average_column: ['avg']}, workers = workers)
 
 
-    def sum(self, group_column, sum_column):
-        #Grouping 
-        groups = self.group_by(group_column)
+    @_profiled
+    def sum(self, group_column, sum_column, workers = None):
+        return self.agg(group_column, {sum_column: ['sum']}, workers = workers)
     
-        result_data = {
-            group_column: [],
-            f'{sum_column}_sum': []
-        }
-        
-        for group_key, row_indices in groups.items():
-            result_data[group_column].append(group_key)
-            
-            #Getting values to sum, removes None
-            values = [self.data[sum_column][i] for i in row_indices]
-            values = [i for i in values if i is not None]
-
-            #"built ins" because there is a name conflict with pythons sum
-            total = sum(values) if values else 0
-            result_data[f'{sum_column}_sum'].append(total)
-        
-        return dataFrame(result_data, [group_column, f'{sum_column}_sum'])
+
+    @_profiled
+    def max(self, group_column, max_column, workers = None):
+        return self.agg(group_column, {max_column: ['max']}, workers = workers)
+
+
+    @_profiled
+    def min(self, group_column, min_column, workers = None):
+        return self.agg(group_column, {min_column: ['min']}, workers = workers)
     
 
-    def max(self, group_column, max_column):
-        #Grouping
-        groups = self.group_by(group_column)
-        
-        result_data = {
-            group_column: [],
-            f'{max_column}_max': []
-        }
-        
-        for group_key, row_indices in groups.items():
-            result_data[group_column].append(group_key)
-
-            #Getting values to find max, removes none
-            values = [self.data[max_column][i] for i in row_indices]
-            values = [i for i in values if i is not None]
-            
-            # Selecting the Maximum out of all the values
-            max_val =  max(values) if values else None
-            result_data[f'{max_column}_max'].append(max_val)
-        
-        return dataFrame(result_data, [group_column, f'{max_column}_max'])
+    # Counting number of rows per group
+    @_profiled
+    def count(self, group_column, workers = None):
+        return self.agg(group_column, {'*': ['count']}, workers = workers)
 
 
-    def min(self, group_column, min_column):
-        #Grouping
-        groups = self.group_by(group_column)
-        
-        result_data = {
-            group_column: [],
-            f'{min_column}_min': []
-        }
-        
-        for group_key, row_indices in groups.items():
-            result_data[group_column].append(group_key)
 
-            #Getting values to find min, removes none
-            values = [self.data[min_column][i] for i in row_indices]
-            values = [v for v in values if v is not None]  
+    #////////////////////   Approximate aggregates   /////////////////////////////////////
+    # Distinct non-None values in a column, estimated with a HyperLogLog sketch
+    @_profiled
+    def approx_count_distinct(self, column, precision = HLL_PRECISION):
+        if column not in self.column_names:
+            raise KeyError(f"Column '{column}' not found!")
+        return round(HyperLogLog.from_column(self.data[column], precision).estimate())
 
-            # Selecting the minimum out of all the values
-            min_val = min(values) if values else None
-            result_data[f'{min_column}_min'].append(min_val)
-        
-        return dataFrame(result_data, [group_column, f'{min_column}_min'])
-    
 
-    def count(self, group_column):
-        #Grouping
-        groups = self.group_by(group_column)
-        
-        result_data = {
-            group_column: [],
-            'count': []
-        }
-        
-        for group_key, row_indices in groups.items():
-            result_data[group_column].append(group_key)
-            
-            # Counting number of rows
-            count_val = len(row_indices)
-            result_data['count'].append(count_val)
-        
-        return dataFrame(result_data, [group_column, 'count'])
+    # Sampled versions of avg/sum, grouped the same way by one or several
+    # columns. Besides the estimate ('<column>_avg' / '<column>_sum') each
+    # group gets '_low' and '_high' bounds at the given confidence and the
+    # number of sampled rows it had.
+    # Groups with no sampled rows are missing; a group with a single sampled
+    # value has no avg bounds (None).
+    @_profiled
+    def approx_avg(self, group_column, average_column, sample_rows = APPROX_SAMPLE_ROWS, confidence = 0.95,
+                   seed = None):
+        return self._approx(group_column, average_column, 'avg', sample_rows, confidence, seed)
+
+
+    @_profiled
+    def approx_sum(self, group_column, sum_column, sample_rows = APPROX_SAMPLE_ROWS, confidence = 0.95, seed = None):
+        return self._approx(group_column, sum_column, 'sum', sample_rows, confidence, seed)
+
+
+    def _approx(self, group_column, value_column, function, sample_rows, confidence, seed):
+        by = [group_column] if isinstance(group_column, str) else list(group_column)
+        if not by:
+            raise ValueError(f"approx_{function} needs at least one group column")
+        for col in by + [value_column]:
+            if col not in self.column_names:
+                raise KeyError(f"Column '{col}' not found!")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        if sample_rows < 1:
+            raise ValueError("sample_rows must be at least 1")
+
+        population = self.shape[0]
+        if population <= sample_rows:
+            rows = array('q', range(population))
+        else:
+            # Sorted, so groups come out in the order they are first sampled
+            rows = array('q', sorted(random.Random(seed).sample(range(population), sample_rows)))
+
+        name = f'{value_column}_{function}'
+        names = by + [name, f'{name}_low', f'{name}_high', 'sampled']
+        result = {col: [] for col in names}
+        if population:
+            groups = _approx_groups([self.data[col] for col in by], self.data[value_column], function, rows,
+                                    population, confidence)
+            for key, *values in groups:
+                # Split tuple keys back into their group columns
+                key_parts = key if len(by) > 1 else (key,)
+                for col, value in zip(names, chain(key_parts, values)):
+                    result[col].append(value)
+        return dataFrame(result, names)
     
 
 
+    #////////////////////   Sorting   /////////////////////////////////////
+    # df.order_by(['position', 'points_per_game'], ascending = [True, False], limit = 10)
+    # ascending is one bool for every column or one per column. Nulls go last.
+    # limit=k keeps only the first k rows using a heap; without a limit, data
+    # whose sort keys need more than memory_budget bytes is sorted in runs that
+    # are spilled to temp files and merged. Returns views of the sorted rows.
+    @_profiled
+    def order_by(self, columns, ascending = True, limit = None, memory_budget = SORT_MEMORY_BYTES):
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        ascending = [ascending] * len(columns) if isinstance(ascending, bool) else list(ascending)
+
+        if not columns:
+            raise ValueError("order_by needs at least one column")
+        for col in columns:
+            if col not in self.column_names:
+                raise KeyError(f"Column '{col}' not found!")
+        if len(ascending) != len(columns):
+            raise ValueError("ascending needs one value per sort column")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+
+        rows = _sort_rows([self.data[col] for col in columns], ascending, limit, memory_budget)
+        return dataFrame(_view_columns(self.data, rows), list(self.column_names))
+
+
+
     #////////////////////   Join functions   /////////////////////////////////////
-    def join(self, df_to_join, left_key, right_key):
+    # With memory_budget=bytes the join is done as a grace hash join (see
+    # iter_join) with enough partitions that each fits the budget; the rows
+    # then come out grouped by partition rather than in left-row order.
+    # With bloom_filter=True the bigger side is first cut down to the rows
+    # whose key may be in a BloomFilter of the smaller side's keys (same
+    # result); with a memory_budget too, the filter keeps left rows that can't
+    # match out of the partition files.
+    @_profiled
+    def join(self, df_to_join, left_key, right_key, how = 'inner', memory_budget = None, bloom_filter = False):
         # Validate keys exist
         if left_key not in self.column_names:
             raise KeyError(f"Left key '{left_key}' not found in left DataFrame!")
         if right_key not in df_to_join.column_names:
             raise KeyError(f"Right key '{right_key}' not found in right DataFrame!")
-        
-        # Initialize result columns
+        if how not in ('inner', 'left', 'right', 'outer'):
+            raise ValueError("Join type must be 'inner', 'left', 'right' or 'outer'")
+
+        if memory_budget is not None:
+            cells = self.shape[0] * self.shape[1] + df_to_join.shape[0] * df_to_join.shape[1]
+            partitions = min(_MAX_JOIN_PARTITIONS, max(1, -(-cells * JOIN_CELL_BYTES // memory_budget)))
+            frames = list(iter_join(self, df_to_join, left_key, right_key, how, partitions, bloom_filter = bloom_filter))
+            result_columns, _ = _join_columns(self.column_names, df_to_join.column_names, right_key)
+            return _concat_frames(frames, result_columns)
+
+        key = ('join', self.fingerprint(), df_to_join.fingerprint(), left_key, right_key, how)
+        if bloom_filter:
+            return self._cached(key, lambda: self._bloom_join(df_to_join, left_key, right_key, how))
+        return self._cached(key, lambda: self._join(df_to_join, left_key, right_key, how))
+
+
+    # Only a side whose unmatched rows are dropped anyway can be filtered: the
+    # left for inner/right joins, the right for inner/left joins
+    def _bloom_join(self, df_to_join, left_key, right_key, how):
+        left, right = self, df_to_join
+        if left.shape[0] >= right.shape[0] and how in ('inner', 'right'):
+            rows = BloomFilter.from_column(right.data[right_key]).matching_rows(left.data[left_key])
+            left = dataFrame(_view_columns(left.data, rows), list(left.column_names))
+        elif right.shape[0] > left.shape[0] and how in ('inner', 'left'):
+            rows = BloomFilter.from_column(left.data[left_key]).matching_rows(right.data[right_key])
+            right = dataFrame(_view_columns(right.data, rows), list(right.column_names))
+        return left._join(right, left_key, right_key, how)
+
+
+    def _join(self, df_to_join, left_key, right_key, how):
+        result_columns, changed_columns = _join_columns(self.column_names, df_to_join.column_names, right_key)
+        # An existing hash index on the right key is the build side already
+        index = df_to_join.get_index(right_key, 'hash')
+        if index is not None:
+            pairs = _hash_join_pairs(self.data[left_key], df_to_join.data[right_key], how, index.table)
+        else:
+            pairs = _hash_join_pairs(*_join_keys(self.data[left_key], df_to_join.data[right_key]), how)
+
+        left_rows = [i for i, _ in pairs]
+        right_rows = [j for _, j in pairs]
+
+        # Gather each output column in one pass (None rows become nulls)
         result_data = {}
-        result_columns = []
-        changed_columns = {}
-        
-        # Add all columns from left DataFrame
         for col in self.column_names:
-            result_data[col] = []
-            result_columns.append(col)
-        
-        # Add columns from right DataFrame (skip join key to avoid duplication)
+            result_data[col] = self.data[col].take(left_rows)
+
         for col in df_to_join.column_names:
             if col != right_key:
-                # Check for matching columns that isn't key
-                if col in result_columns:
-                    new_col_name = f"{col}_right"
-                    result_data[new_col_name] = []
-                    result_columns.append(new_col_name)
-                    changed_columns[col] = new_col_name
-
-                # No matching columns found
-                else:
-                    result_data[col] = []
-                    result_columns.append(col)
-        
-        
-        for i in range(self.shape[0]):
-            left_value = self.data[left_key][i]
-            
-            # Find matching rows in df_to_join
-            for j in range(df_to_join.shape[0]):
-                right_value = df_to_join.data[right_key][j]
-                
-                # Match found in both tables
-                if left_value == right_value:   
-                    for col in self.column_names:
-                        result_data[col].append(self.data[col][i])
-                    
-                    for col in df_to_join.column_names:
-                        if col != right_key:
-                            if col in changed_columns:
-                                result_data[changed_columns[col]].append(df_to_join.data[col][j])
-                            else:
-                                result_data[col].append(df_to_join.data[col][j])
-        
+                result_data[changed_columns.get(col, col)] = df_to_join.data[col].take(right_rows)
+
+        # Right-only rows keep their key in the left key column
+        key_column = result_data[left_key]
+        for row, (i, j) in enumerate(pairs):
+            if i is None:
+                key_column[row] = df_to_join.data[right_key][j]
+
         return dataFrame(result_data, result_columns)
     
         
 
+    #////////////////////   Semi and anti joins   /////////////////////////////////////
+    # Left rows that have (semi_join) or don't have (anti_join) a row with the
+    # same key in df_to_join, as views of the left frame. Only the right key
+    # column is read, so none of the right frame's columns are materialized.
+    @_profiled
+    def semi_join(self, df_to_join, left_key, right_key):
+        return self._filter_join(df_to_join, left_key, right_key, True)
+
+
+    @_profiled
+    def anti_join(self, df_to_join, left_key, right_key):
+        return self._filter_join(df_to_join, left_key, right_key, False)
+
+
+    def _filter_join(self, df_to_join, left_key, right_key, keep):
+        if left_key not in self.column_names:
+            raise KeyError(f"Left key '{left_key}' not found in left DataFrame!")
+        if right_key not in df_to_join.column_names:
+            raise KeyError(f"Right key '{right_key}' not found in right DataFrame!")
+
+        # A hash index on the right key already holds its distinct keys
+        index = df_to_join.get_index(right_key, 'hash')
+        keys = index.table if index is not None else set(df_to_join.data[right_key])
+
+        column = self.data[left_key]
+        encoded = _dictionary_codes(column)
+        if encoded is None:
+            mask = [(value in keys) is keep for value in column]
+        else:
+            # Dict columns look each distinct string up once
+            codes, base = encoded
+            table = [(value in keys) is keep for value in base.dictionary] + [(None in keys) is keep]
+            mask = map(table.__getitem__, codes)
+
+        rows = list(compress(range(self.shape[0]), mask))
+        return dataFrame(_view_columns(self.data, rows), list(self.column_names))
+
+
+
 #////////////////////  display all columns and rows helping function   /////////////////////////////////////
     def display_all(self):
-        """Display all rows and columns"""
+        """Display all rows and columns (use iter_lines() to stream them instead)"""
         if not self.column_names:
             return "Empty DataFrame"
-        
-        result = []
-        
-        # All columns
-        header_row = " | ".join(f"{h:<20}" for h in self.column_names)
-        result.append(header_row)
-        result.append("-" * len(header_row))
-        
-        # All rows
-        for i in range(self.shape[0]):
-            row_data = []
-            for header in self.column_names:
-                value = str(self.data[header][i])
-                row_data.append(f"{value:<20}")
-            result.append(" | ".join(row_data))
-        
-        result.append(f"\nDataFrame Shape: {self.shape}")
-        return "\n".join(result)
+
+        return "\n".join(self.iter_lines())
     
 
 
+#////////////////////   Lazy query plans   /////////////////////////////////////
+# df.lazy() (or scan_csv(path)) records select/where/join calls as a logical
+# plan instead of running them. collect() optimizes the plan first:
+#   - filters are split on & and pushed below selects and joins (and into the
+#     CSV scan, so rows are dropped chunk by chunk while loading)
+#   - columns nobody reads are pruned, down to the CSV scan which then never
+#     parses them
+# Lambda filters can't be looked into, so they stay where they are and keep
+# every column of their input.
+
+class _Scan:
+    def __init__(self, df):
+        self.df = df
+
+    def columns(self):
+        return list(self.df.column_names)
+
+    def children(self):
+        return []
+
+    def describe(self):
+        return f"Scan dataFrame {self.df.shape}"
+
+    def execute(self):
+        return self.df
+
+
+class _CsvScan:
+    def __init__(self, path, separator = ',', schema = None, columns = None, predicates = (), header = None):
+        self.path = path
+        self.separator = separator
+        self.schema = schema
+        self.wanted = columns
+        self.predicates = list(predicates)
+
+        # Only the header is read up front
+        if header is None:
+            with open(path, 'r') as file:
+                header = _clean_header(file.readline(), separator)
+        self.header = header
+
+    def columns(self):
+        if self.wanted is None:
+            return list(self.header)
+        return [col for col in self.header if col in self.wanted]
+
+    def children(self):
+        return []
+
+    def describe(self):
+        text = f"CsvScan {self.path} columns={self.columns()}"
+        if self.predicates:
+            text += f" filter={_conjunction(self.predicates)!r}"
+        return text
+
+    @_profiled
+    def execute(self):
+        output = self.columns()
+        needed = set(output)
+        for predicate in self.predicates:
+            needed |= predicate.columns()
+        load = [col for col in self.header if col in needed]
+
+        # Filter each chunk as it is parsed, then drop filter-only columns
+        frames = []
+        for chunk in iter_csv(self.path, self.separator, schema = self.schema, columns = load):
+            if self.predicates and chunk.shape[0]:
+                chunk = chunk.where(_conjunction(self.predicates))
+            if chunk.shape[0]:
+                frames.append(chunk.select(output))
+        return _concat_frames(frames, output)
+
+
+class _Select:
+    def __init__(self, child, columns):
+        self.child = child
+        self.columns_list = list(columns)
+
+    def columns(self):
+        return list(self.columns_list)
+
+    def children(self):
+        return [self.child]
+
+    def describe(self):
+        return f"Select {self.columns_list}"
+
+    def execute(self):
+        return self.child.execute().select(self.columns_list)
+
+
+class _Where:
+    def __init__(self, child, condition):
+        self.child = child
+        self.condition = condition
+
+    def columns(self):
+        return self.child.columns()
+
+    def children(self):
+        return [self.child]
+
+    def describe(self):
+        if isinstance(self.condition, (Expr, dict)):
+            return f"Where {self.condition!r}"
+        return "Where <function>"
+
+    def execute(self):
+        return self.child.execute().where(self.condition)
+
+
+class _Join:
+    def __init__(self, left, right, left_key, right_key, how):
+        self.left = left
+        self.right = right
+        self.left_key = left_key
+        self.right_key = right_key
+        self.how = how
+
+        # Output names are fixed by the full inputs, even if pruning later
+        # removes the left column that made a right column clash
+        self.left_columns = left.columns()
+        self.right_columns = right.columns()
+        self.output, self.changed = _join_columns(self.left_columns, self.right_columns, right_key)
+
+    def columns(self):
+        left = set(self.left.columns())
+        right = set(self.right.columns())
+        return [col for col in self.left_columns if col in left] + \
+               [self.changed.get(col, col) for col in self.right_columns if col in right and col != self.right_key]
+
+    def children(self):
+        return [self.left, self.right]
+
+    def describe(self):
+        return f"Join {self.how} on {self.left_key} = {self.right_key}"
+
+    def execute(self):
+        left_df = self.left.execute()
+        right_df = self.right.execute()
+        result = left_df.join(right_df, self.left_key, self.right_key, self.how)
+
+        # Restore the right-side names of the unpruned plan
+        _, changed_now = _join_columns(left_df.column_names, right_df.column_names, self.right_key)
+        renames = {changed_now.get(col, col): self.changed.get(col, col)
+                   for col in right_df.column_names if col != self.right_key}
+        if all(old == new for old, new in renames.items()):
+            return result
+
+        names = [renames.get(col, col) if i >= len(left_df.column_names) else col
+                 for i, col in enumerate(result.column_names)]
+        renamed = dataFrame({new: result.data[old] for old, new in zip(result.column_names, names)}, names)
+        renamed._profile = result._profile
+        return renamed
+
+    # Same join over new (filtered or pruned) inputs, keeping the original names
+    def with_children(self, left, right):
+        joined = copy.copy(self)
+        joined.left = left
+        joined.right = right
+        return joined
+
+    # Where each output column comes from: ('left' | 'right', source column)
+    def origins(self):
+        origins = {col: ('left', col) for col in self.left_columns}
+        for col in self.right_columns:
+            if col != self.right_key:
+                origins[self.changed.get(col, col)] = ('right', col)
+        return origins
+
+
+# dict conditions become col == value conjuncts (None has different meaning, so those stay opaque)
+def _split_condition(condition):
+    if isinstance(condition, Expr):
+        return _conjuncts(condition)
+    if isinstance(condition, dict) and condition and None not in condition.values():
+        return [Col(name) == value for name, value in condition.items()]
+    return None
+
+
+def _with_filters(node, predicates):
+    return _Where(node, _conjunction(predicates)) if predicates else node
+
+
+# Moves filter conjuncts as far down the plan as they can legally go
+def _push_filters(node, predicates):
+    if isinstance(node, _Where):
+        conjuncts = _split_condition(node.condition)
+        if conjuncts is None:
+            # Filters commute, so ours can still go below an opaque one
+            return _Where(_push_filters(node.child, predicates), node.condition)
+        return _push_filters(node.child, predicates + conjuncts)
+
+    if isinstance(node, _Select):
+        # A filter on a column the select drops must still fail, so keep it above
+        available = set(node.columns_list)
+        below = [p for p in predicates if p.columns() <= available]
+        above = [p for p in predicates if not p.columns() <= available]
+        return _with_filters(_Select(_push_filters(node.child, below), node.columns_list), above)
+
+    if isinstance(node, _Join):
+        origins = node.origins()
+        left_ok = node.how in ('inner', 'left')
+        right_ok = node.how in ('inner', 'right')
+        to_left, to_right, above = [], [], []
+
+        for predicate in predicates:
+            sides = {origins[name][0] if name in origins else None for name in predicate.columns()}
+            if sides == {'left'} and left_ok:
+                to_left.append(predicate)
+                # Inner join keys are equal on both sides, so key filters go to both
+                if node.how == 'inner' and predicate.columns() == {node.left_key}:
+                    to_right.append(predicate.rename({node.left_key: node.right_key}))
+            elif sides == {'right'} and right_ok:
+                to_right.append(predicate.rename({name: origins[name][1] for name in predicate.columns()}))
+            else:
+                above.append(predicate)
+
+        joined = node.with_children(_push_filters(node.left, to_left), _push_filters(node.right, to_right))
+        return _with_filters(joined, above)
+
+    if isinstance(node, _CsvScan):
+        columns = set(node.header)
+        inside = [p for p in predicates if p.columns() <= columns]
+        outside = [p for p in predicates if not p.columns() <= columns]
+        scan = _CsvScan(node.path, node.separator, node.schema, node.wanted, node.predicates + inside, node.header)
+        return _with_filters(scan, outside)
+
+    return _with_filters(node, predicates)
+
+
+# Drops columns that nothing above reads
+def _prune_columns(node, required):
+    if isinstance(node, _Select):
+        return _Select(_prune_columns(node.child, set(node.columns_list)), node.columns_list)
+
+    if isinstance(node, _Where):
+        condition = node.condition
+        if isinstance(condition, Expr):
+            needed = required | condition.columns()
+        elif isinstance(condition, dict):
+            needed = required | set(condition)
+        else:
+            # A lambda can read any column
+            needed = set(node.child.columns())
+        return _Where(_prune_columns(node.child, needed), condition)
+
+    if isinstance(node, _Join):
+        origins = node.origins()
+        left_needed = {node.left_key}
+        right_needed = {node.right_key}
+        for name in required:
+            if name in origins:
+                side, source = origins[name]
+                (left_needed if side == 'left' else right_needed).add(source)
+
+        return node.with_children(_prune_columns(node.left, left_needed), _prune_columns(node.right, right_needed))
+
+    if isinstance(node, _CsvScan):
+        wanted = required if node.wanted is None else required & set(node.wanted)
+        return _CsvScan(node.path, node.separator, node.schema, wanted, node.predicates, node.header)
+
+    if isinstance(node, _Scan):
+        kept = [col for col in node.df.column_names if col in required]
+        if len(kept) < len(node.df.column_names):
+            return _Select(node, kept)
+
+    return node
+
+
+def _optimize(plan):
+    plan = _push_filters(plan, [])
+    return _prune_columns(plan, set(plan.columns()))
+
+
+class LazyFrame:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def select(self, columns):
+        available = self.plan.columns()
+        for col in columns:
+            if col not in available:
+                raise KeyError(f"Column '{col}' doesn't exist!")
+        return LazyFrame(_Select(self.plan, columns))
+
+    def where(self, condition):
+        return LazyFrame(_Where(self.plan, condition))
+
+    def join(self, df_to_join, left_key, right_key, how = 'inner'):
+        right = df_to_join.plan if isinstance(df_to_join, LazyFrame) else _Scan(df_to_join)
+        if left_key not in self.plan.columns():
+            raise KeyError(f"Left key '{left_key}' not found in left DataFrame!")
+        if right_key not in right.columns():
+            raise KeyError(f"Right key '{right_key}' not found in right DataFrame!")
+        if how not in ('inner', 'left', 'right', 'outer'):
+            raise ValueError("Join type must be 'inner', 'left', 'right' or 'outer'")
+        return LazyFrame(_Join(self.plan, right, left_key, right_key, how))
+
+    @property
+    def column_names(self):
+        return self.plan.columns()
+
+    def optimize(self):
+        return LazyFrame(_optimize(self.plan))
+
+    # Text tree of the (optimized) plan. analyze=True runs it with profiling on
+    # and shows the operations that actually ran, with their stats.
+    def explain(self, optimized = True, analyze = False):
+        plan = _optimize(self.plan) if optimized else self.plan
+        if analyze:
+            with profiling():
+                result = plan.execute()
+            return result.explain(analyze = True)
+
+        lines = []
+
+        def walk(node, depth):
+            lines.append("  " * depth + node.describe())
+            for child in node.children():
+                walk(child, depth + 1)
+
+        walk(plan, 0)
+        return "\n".join(lines)
+
+    def collect(self, optimize = True):
+        plan = _optimize(self.plan) if optimize else self.plan
+        return plan.execute()
+
+
+# Lazy CSV source: filters and column pruning are pushed into the loader
+def scan_csv(csv_file, separator = ',', schema = None):
+    return LazyFrame(_CsvScan(csv_file, separator, schema))
+
+
+
 #////////////////////   Main function   /////////////////////////////////////
 def main():
     # Getting data and storing as DataFrame
     player_file = "player.csv"
     Warriors_file = "WarriorsStats.csv"
-    data, column_names = load_csv(player_file)
-    data2, column_names2 = load_csv(Warriors_file)
-
-    df = dataFrame(data, column_names)  #Player Dataframe
-    df2 = dataFrame(data2, column_names2)   #Warriors DF
+    # Snapshots (player.csv.dfcol, ...) are reused until the CSV changes
+    df = load_with_snapshot(player_file)  #Player Dataframe
+    df2 = load_with_snapshot(Warriors_file)   #Warriors DF
 
 
     #/////////////  Testing Functions  ////////////////////////
@@ -459,4 +3724,5 @@ def main():
     
     # print(result)
 
-main()
+if __name__ == "__main__":
+    main()
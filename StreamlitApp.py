@@ -1,10 +1,12 @@
 # Nicolas Moy
 # DSCI 551 Semester Project
 
+import shutil
 import streamlit as st
-import os
 import tempfile
-from Project import load_csv, dataFrame
+import weakref
+from contextlib import nullcontext
+from Project import APPROX_SAMPLE_ROWS, ParseCache, RESULT_CACHE, profiling, col as col_expr
 
 # //////////////////////  Streamlit Setup Stuff ///////////////////////////////////////////////
 st.set_page_config(page_title="NBA Data Analysis - DSCI 551 Project", layout="wide")
@@ -54,6 +56,12 @@ if 'player_df' not in st.session_state:
     st.session_state.player_df = None
 if 'warriors_df' not in st.session_state:
     st.session_state.warriors_df = None
+if 'parse_cache' not in st.session_state:
+    # Parsed uploads keyed by content hash. Snapshots go to a private
+    # directory of this session, removed once the session's cache is dropped
+    snapshot_dir = tempfile.mkdtemp(prefix="dsci551_")
+    st.session_state.parse_cache = ParseCache(snapshot_dir=snapshot_dir)
+    weakref.finalize(st.session_state.parse_cache, shutil.rmtree, snapshot_dir, ignore_errors=True)
 
 # Sidebar for file uploads
 st.sidebar.title("📁 Data Upload")
@@ -63,41 +71,79 @@ st.sidebar.write("Upload your CSV files to begin analysis")
 player_file = st.sidebar.file_uploader("Upload Player Data CSV", type=['csv'], key="player_upload")
 warriors_file = st.sidebar.file_uploader("Upload Warriors Stats CSV", type=['csv'], key="warriors_upload")
 
+
 if player_file is not None:
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as tmp:
-        content = player_file.read().decode('utf-8')
-        tmp.write(content)
-        tmp_path = tmp.name
-    
     try:
-        # Load the CSV
-        data, columns = load_csv(tmp_path)
-        st.session_state.player_df = dataFrame(data, columns)
+        # Same bytes as an earlier upload return the same dataFrame, indexes included
+        st.session_state.player_df = st.session_state.parse_cache.get_or_parse(player_file.getvalue())
         st.sidebar.success("✅ Player data loaded successfully!")
     except Exception as e:
         st.sidebar.error(f"Error loading player data: {str(e)}")
-    finally:
-        # Clean up temp file
-        os.unlink(tmp_path)
 
 if warriors_file is not None:
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as tmp:
-        content = warriors_file.read().decode('utf-8')
-        tmp.write(content)
-        tmp_path = tmp.name
-    
     try:
-        # Load the CSV
-        data, columns = load_csv(tmp_path)
-        st.session_state.warriors_df = dataFrame(data, columns)
+        st.session_state.warriors_df = st.session_state.parse_cache.get_or_parse(warriors_file.getvalue())
         st.sidebar.success("✅ Warriors data loaded successfully!")
     except Exception as e:
         st.sidebar.error(f"Error loading warriors data: {str(e)}")
-    finally:
-        # Clean up temp file
-        os.unlink(tmp_path)
+
+cache_stats = st.session_state.parse_cache.stats()
+st.sidebar.caption(f"Parse cache: {cache_stats['entries']} files, {cache_stats['bytes'] / 2**20:.1f} MB, "
+                   f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
+
+# Operator stats (time, rows, memory) are only recorded while this is ticked
+profile_queries = st.sidebar.checkbox("Profile queries", value=False,
+                                      help="Record per-operator time, row counts and memory (slower while on)")
+
+
+# Runs one of this session's operations, profiled when the box is ticked.
+# profiling() only covers the calling thread, so other sessions are unaffected.
+def profiled(operation, *args, **kwargs):
+    with profiling() if profile_queries else nullcontext():
+        return operation(*args, **kwargs)
+
+
+# Shows how a result was built, with per-operator stats when it was profiled
+def show_profile(result):
+    if profile_queries:
+        with st.expander("Query profile"):
+            st.code(result.explain(analyze=True), language="text")
+
+
+# Shows one page of a result with controls to move through it. Only the rows
+# on the current page are read from the result.
+def show_page(result, key, columns=None):
+    columns = result.column_names if columns is None else columns
+    size_col, page_col = st.columns(2)
+    with size_col:
+        page_size = st.selectbox("Rows per page:", [10, 25, 50, 100], key=f"{key}_page_size")
+
+    pages = max(1, (result.shape[0] + page_size - 1) // page_size)
+    # Keep the page number in range when the page size grows
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with page_col:
+        page_number = st.number_input(f"Page (of {pages}):", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    offset = (page_number - 1) * page_size
+    page = result.page(offset, page_size, columns)
+    st.dataframe({col: page.data[col].to_list() for col in columns})
+    st.caption(f"Rows {min(offset + 1, result.shape[0])}-{offset + page.shape[0]} of {result.shape[0]}")
+
+
+# Per-column min/max/nulls/distinct from the column stats (built on the first call)
+def show_column_profiles(frame):
+    with st.expander("Column Profiles"):
+        profiles = frame.stats()
+        st.dataframe({col: [str(v) if col in ('min', 'max') else v for v in profiles.data[col]]
+                      for col in profiles.column_names})
+
+
+# Keeps a result across reruns so paging through it doesn't need the button again
+def keep_result(key, result, code, columns=None):
+    st.session_state[f"{key}_result"] = (result, code, columns)
+    st.session_state.pop(f"{key}_page", None)
 
 
 # //////////////////////  Main content area  ///////////////////////////////////////////////
@@ -154,7 +200,7 @@ else:
         operation = st.selectbox(
             "Select Operation to Demonstrate:",
             ["Data Preview", "SELECT (Projection)", "WHERE (Filtering)", 
-             "Aggregation Functions", "JOIN Operations"]
+             "Aggregation Functions", "ORDER BY (Sorting)", "JOIN Operations"]
         )
         
         # Using warriors stats for dataframe operations
@@ -163,31 +209,26 @@ else:
         
         if operation == "Data Preview":
             st.markdown('<h2 class="section-header">Data Preview</h2>', unsafe_allow_html=True)
-            st.write("First 10 rows of Warriors data:")
+            st.write("Warriors data:")
             
-            # Create preview of warriors data
-            preview_data = {}
-            num_rows = min(10, df.shape[0])
-            for col in df.column_names[:9]:  # Show first 8 columns
-                preview_data[col] = [df.data[col][i] for i in range(num_rows)]
-            st.dataframe(preview_data)
+            # Page through the warriors data (first 9 columns)
+            show_page(df, "warriors_preview", df.column_names[:9])
             
             # Show column info
             with st.expander("View Column Names"):
                 st.write(df.column_names)
+            show_column_profiles(df)
 
-            st.write("First 10 rows of Player Data:")
-            
-            # Create preview of Player data
-            preview_data2 = {}
-            num_rows2 = min(10, df2.shape[0])
-            for col in df2.column_names[:8]:  # Show first 8 columns
-                preview_data2[col] = [df2.data[col][i] for i in range(num_rows2)]
-            st.dataframe(preview_data2)
+            if df2 is not None:
+                st.write("Player Data:")
 
-            # Show column info
-            with st.expander("View Column Names"):
-                st.write(df2.column_names)
+                # Page through the player data (first 8 columns)
+                show_page(df2, "player_preview", df2.column_names[:8])
+
+                # Show column info
+                with st.expander("View Column Names"):
+                    st.write(df2.column_names)
+                show_column_profiles(df2)
 
         # //////////////////  Selecting  //////////////////////////
         elif operation == "SELECT (Projection)":
@@ -201,18 +242,18 @@ else:
             
             if st.button("Execute SELECT", key="select_btn"):
                 if selected_columns:
-                    result = df.select(selected_columns)
-                    st.code(f"df.select({selected_columns})", language="python")
-                    
-                    # Display results
-                    st.success(f"✅ Selected {len(selected_columns)} columns")
-                    result_data = {}
-                    num_rows = min(10, result.shape[0])
-                    for col in selected_columns:
-                        result_data[col] = [result.data[col][i] for i in range(num_rows)]
-                    st.dataframe(result_data)
+                    keep_result("select", profiled(df.select, selected_columns), f"df.select({selected_columns})")
                 else:
                     st.warning("Please select at least one column")
+
+            if st.session_state.get("select_result"):
+                result, code, _ = st.session_state.select_result
+                st.code(code, language="python")
+                
+                # Display results
+                st.success(f"✅ Selected {len(result.column_names)} columns")
+                show_page(result, "select")
+                show_profile(result)
         # //////////////////  Where Filtering  ///////////////////////////////
         elif operation == "WHERE (Filtering)":
             st.markdown('<h2 class="section-header">WHERE Operation - Row Filtering</h2>', unsafe_allow_html=True)
@@ -241,17 +282,9 @@ else:
                         except:
                             typed_value = filter_value
                         
-                        result = df.where({filter_col: typed_value})
-                        st.code(f"df.where({{'{filter_col}': {typed_value}}})", language="python")
-                        st.success(f"✅ Found {result.shape[0]} matching rows")
-                        
-                        if result.shape[0] > 0:
-                            # Show results
-                            result_data = {}
-                            num_rows = min(10, result.shape[0])
-                            for col in result.column_names[:6]:
-                                result_data[col] = [result.data[col][i] for i in range(num_rows)]
-                            st.dataframe(result_data)
+                        result = profiled(df.where, {filter_col: typed_value})
+                        keep_result("where", result, f"df.where({{'{filter_col}': {typed_value}}})",
+                                    result.column_names[:6])
                     else:
                         st.warning("Please enter a value to filter by")
             else:
@@ -265,29 +298,33 @@ else:
                     comparison = st.selectbox("Comparison:", [">", "<", ">=", "<=", "=="])
                     
                     if st.button("Apply Custom Filter"):
+                        # Column expression, evaluated a column at a time (None never matches)
+                        column = col_expr(col_choice)
                         if comparison == ">":
-                            result = df.where(lambda row: row[col_choice] > threshold if row[col_choice] else False)
+                            condition = column > threshold
                         elif comparison == "<":
-                            result = df.where(lambda row: row[col_choice] < threshold if row[col_choice] else False)
+                            condition = column < threshold
                         elif comparison == ">=":
-                            result = df.where(lambda row: row[col_choice] >= threshold if row[col_choice] else False)
+                            condition = column >= threshold
                         elif comparison == "<=":
-                            result = df.where(lambda row: row[col_choice] <= threshold if row[col_choice] else False)
-                        else:
-                            result = df.where(lambda row: row[col_choice] == threshold if row[col_choice] else False)
-                        
-                        st.code(f"df.where(lambda row: row['{col_choice}'] {comparison} {threshold})", language="python")
-                        st.success(f"✅ Found {result.shape[0]} matching rows")
-
-                        if result.shape[0] > 0:
-                            # Show results
-                            result_data = {}
-                            num_rows = min(10, result.shape[0])
-                            for col in result.column_names[:6]:
-                                result_data[col] = [result.data[col][i] for i in range(num_rows)]
-                            st.dataframe(result_data)
+                            condition = column <= threshold
                         else:
-                            st.info("No rows meet ccndition")
+                            condition = column == threshold
+                        result = profiled(df.where, condition)
+                        keep_result("where", result, f"df.where({condition!r})", result.column_names[:6])
+
+            # Both filter modes share one result, paged below
+            if st.session_state.get("where_result"):
+                result, code, columns = st.session_state.where_result
+                st.code(code, language="python")
+                st.success(f"✅ Found {result.shape[0]} matching rows")
+
+                if result.shape[0] > 0:
+                    # Show results
+                    show_page(result, "where", columns)
+                else:
+                    st.info("No rows meet ccndition")
+                show_profile(result)
         
         # //////////////////////  Aggregation  ///////////////////////////////
         elif operation == "Aggregation Functions":
@@ -307,32 +344,77 @@ else:
                     st.error("No numeric columns available for aggregation")
                     agg_col = None
             
+            # Distinct groups, estimated from a HyperLogLog sketch of the group column
+            st.caption(f"≈ {df.approx_count_distinct(group_by_col)} distinct values in {group_by_col}")
+
+            # SUM and AVG can show an estimate from a sample first, replaced by the exact values when ready
+            estimate_first = st.checkbox("Show a fast estimate first", key="agg_estimate",
+                                         disabled=agg_function not in ("SUM", "AVG"),
+                                         help="Sampled estimate with 95% confidence bounds while the exact result is computed")
+
             if st.button("Execute Aggregation", key="agg_btn"):
+                if estimate_first and agg_function in ("SUM", "AVG") and agg_col:
+                    estimate_area = st.empty()
+                    with estimate_area.container():
+                        approx = df.approx_sum if agg_function == "SUM" else df.approx_avg
+                        estimate = approx(group_by_col, agg_col)
+                        st.info(f"Estimate from up to {APPROX_SAMPLE_ROWS} sampled rows, computing exact values...")
+                        st.dataframe({col: estimate.data[col].to_list() for col in estimate.column_names})
                 if agg_function == "COUNT":
-                    result = df.count(group_by_col)
-                    st.code(f"df.count('{group_by_col}')", language="python")
+                    keep_result("agg", profiled(df.count, group_by_col), f"df.count('{group_by_col}')")
                 elif agg_col:
                     if agg_function == "SUM":
-                        result = df.sum(group_by_col, agg_col)
-                        st.code(f"df.sum('{group_by_col}', '{agg_col}')", language="python")
+                        keep_result("agg", profiled(df.sum, group_by_col, agg_col), f"df.sum('{group_by_col}', '{agg_col}')")
                     elif agg_function == "AVG":
-                        result = df.avg(group_by_col, agg_col)
-                        st.code(f"df.avg('{group_by_col}', '{agg_col}')", language="python")
+                        keep_result("agg", profiled(df.avg, group_by_col, agg_col), f"df.avg('{group_by_col}', '{agg_col}')")
                     elif agg_function == "MAX":
-                        result = df.max(group_by_col, agg_col)
-                        st.code(f"df.max('{group_by_col}', '{agg_col}')", language="python")
+                        keep_result("agg", profiled(df.max, group_by_col, agg_col), f"df.max('{group_by_col}', '{agg_col}')")
                     elif agg_function == "MIN":
-                        result = df.min(group_by_col, agg_col)
-                        st.code(f"df.min('{group_by_col}', '{agg_col}')", language="python")
+                        keep_result("agg", profiled(df.min, group_by_col, agg_col), f"df.min('{group_by_col}', '{agg_col}')")
+                if estimate_first and agg_function in ("SUM", "AVG") and agg_col:
+                    estimate_area.empty()
                 
-                # Display results
-                if 'result' in locals():
-                    st.success(f"✅ Aggregation complete - {result.shape[0]} groups")
-                    result_data = {}
-                    for col in result.column_names:
-                        result_data[col] = result.data[col]
-                    st.dataframe(result_data)
+            # Display results
+            if st.session_state.get("agg_result"):
+                result, code, _ = st.session_state.agg_result
+                st.code(code, language="python")
+                st.success(f"✅ Aggregation complete - {result.shape[0]} groups")
+                show_page(result, "agg")
+                show_profile(result)
         
+        # //////////////////////  Sorting  ///////////////////////////////
+        elif operation == "ORDER BY (Sorting)":
+            st.markdown('<h2 class="section-header">ORDER BY - Sorting</h2>', unsafe_allow_html=True)
+            st.write("Example: top scorers by position - sort by position, then points_per_game descending")
+
+            sort_columns = st.multiselect(
+                "Sort by columns (in order):",
+                df.column_names,
+                default=[col for col in ['position', 'points_per_game'] if col in df.column_names]
+            )
+            # One direction per sort column
+            directions = []
+            for col in sort_columns:
+                direction = st.radio(f"{col}:", ["Ascending", "Descending"], horizontal=True, key=f"sort_dir_{col}",
+                                     index=1 if col == 'points_per_game' else 0)
+                directions.append(direction == "Ascending")
+            limit = st.number_input("Limit (0 = all rows):", min_value=0, value=0, step=1)
+
+            if st.button("Execute ORDER BY", key="order_btn"):
+                if sort_columns:
+                    result = profiled(df.order_by, sort_columns, ascending=directions, limit=limit or None)
+                    keep_result("order", result,
+                                f"df.order_by({sort_columns}, ascending={directions}, limit={limit or None})")
+                else:
+                    st.warning("Please select at least one column")
+
+            if st.session_state.get("order_result"):
+                result, code, _ = st.session_state.order_result
+                st.code(code, language="python")
+                st.success(f"✅ Sorted - {result.shape[0]} rows")
+                show_page(result, "order")
+                show_profile(result)
+
         #  ////////////////  Joining  ///////////////////////////
         elif operation == "JOIN Operations":
             st.markdown('<h2 class="section-header">JOIN Operations</h2>', unsafe_allow_html=True)
@@ -344,13 +426,43 @@ else:
                 # Let user select join keys
                 left_key = st.selectbox("Warriors table key:", df.column_names)
                 right_key = st.selectbox("Player table key:", st.session_state.player_df.column_names)
+
+                # Semi/anti joins only keep (or drop) the Warriors rows with a matching player
+                join_type = st.selectbox("Join type:", ["inner", "semi", "anti"])
+                use_bloom = st.checkbox("Bloom filter pre-filter", key="join_bloom", disabled=join_type != "inner",
+                                        help="Drop rows of the bigger table whose key can't match before joining")
                 
                 if st.button("Execute JOIN", key="join_btn"):
 
+                    # Hash index on the player key, built once and reused by every later join
+                    if st.session_state.player_df.get_index(right_key) is None:
+                        st.session_state.player_df.create_index(right_key)
+
                     # Perform the join - warriors JOIN players
-                    result = df.join(st.session_state.player_df, left_key, right_key)
-                    st.code(f"warriors.join(players, '{left_key}', '{right_key}')", language="python")
-                    st.success(f"✅ Join complete - {result.shape[0]} matched rows")
+                    if join_type == "semi":
+                        result = profiled(df.semi_join, st.session_state.player_df, left_key, right_key)
+                        code = f"warriors.semi_join(players, '{left_key}', '{right_key}')"
+                    elif join_type == "anti":
+                        result = profiled(df.anti_join, st.session_state.player_df, left_key, right_key)
+                        code = f"warriors.anti_join(players, '{left_key}', '{right_key}')"
+                    else:
+                        result = profiled(df.join, st.session_state.player_df, left_key, right_key,
+                                          bloom_filter=use_bloom)
+                        bloom_code = ", bloom_filter=True" if use_bloom else ""
+                        code = f"warriors.join(players, '{left_key}', '{right_key}'{bloom_code})"
+                    keep_result("join", result, code)
+                    st.session_state.join_result_type = join_type
+
+                if st.session_state.get("join_result"):
+                    result, code, _ = st.session_state.join_result
+                    st.code(code, language="python")
+                    # Anti joins keep the rows that did not match
+                    found, none_found = {
+                        "inner": ("matched rows", "No matching rows found in join operation"),
+                        "semi": ("Warriors rows with a matching player", "No Warriors rows have a matching player"),
+                        "anti": ("Warriors rows with no matching player", "Every Warriors row has a matching player"),
+                    }[st.session_state.get("join_result_type", "inner")]
+                    st.success(f"✅ Join complete - {result.shape[0]} {found}")
                     
                     # Show joined data
                     if result.shape[0] > 0:
@@ -368,25 +480,24 @@ else:
                             if col in result.column_names:
                                 columns_to_show.append(col)
                         
-                        # Display the data
+                        # Display the data (10 columns, one page of rows at a time)
                         st.write("**Joined Data:**")
-                        result_data = {}
-                        num_rows = min(10, result.shape[0])
-                        # Show 10 columns for display
-                        for col in columns_to_show[:10]:  
-                            if col in result.data:
-                                result_data[col] = [result.data[col][i] for i in range(num_rows)]
-                        
-                        st.dataframe(result_data)
+                        show_page(result, "join", columns_to_show[:10])
                         
                         #  Show columns of joined table
                         with st.expander("View all columns in joined result"):
                             st.write("**All columns after join:**")
                             st.write(result.column_names)
                     else:
-                        st.warning("No matching rows found in join operation")
+                        st.warning(none_found)
+                    show_profile(result)
             else:
                 st.warning("Please upload Player data to demonstrate JOIN operations")
 
 # Footer
 st.markdown("---")
+
+# Result cache stats, read after this run's operations so they include them
+result_stats = RESULT_CACHE.stats()
+st.sidebar.caption(f"Result cache: {result_stats['entries']} results, {result_stats['hit_rate']:.0%} hit rate "
+                   f"({result_stats['hits']} hits / {result_stats['misses']} misses)")
@@ -0,0 +1,329 @@
+# Checks the faster engine paths against the plain in-memory or serial result
+# they are meant to match. Run with: python -m pytest tests
+
+import os
+import sys
+import threading
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Project
+from Project import ParseCache, col, dataFrame, iter_join, load_csv, load_with_snapshot, profiling, scan_csv
+
+
+# Every path has to compute its own result, not reuse a cached one
+@pytest.fixture(autouse = True)
+def no_result_cache(monkeypatch):
+    monkeypatch.setattr(Project.RESULT_CACHE, 'max_bytes', 0)
+    Project.RESULT_CACHE.clear()
+
+
+# Rows of a frame as tuples, in column order
+def rows(df):
+    return list(zip(*(list(df.data[col]) for col in df.column_names)))
+
+
+# Same rows in any order
+def same_rows(a, b):
+    assert a.column_names == b.column_names
+    assert sorted(rows(a), key = repr) == sorted(rows(b), key = repr)
+
+
+def contracts(n = 120):
+    return dataFrame({
+        'player_id': [i * 3 % 250 for i in range(n)],
+        'team': [['GSW', 'LAL', None][i % 3] for i in range(n)],
+        'years': [1 + i % 5 for i in range(n)],
+    }, ['player_id', 'team', 'years'])
+
+
+def players(n = 200):
+    positions = ['PG', 'SG', 'SF', 'PF', 'C', None]
+    return dataFrame({
+        'id': list(range(n)),
+        'position': [positions[i % len(positions)] for i in range(n)],
+        'age': [20 + i % 7 for i in range(n)],
+        'salary': [None if i % 11 == 0 else 1000 + (i * 37) % 500 for i in range(n)],
+        'points': [None if i % 13 == 0 else (i * 7 % 300) / 10 for i in range(n)],
+    }, ['id', 'position', 'age', 'salary', 'points'])
+
+
+# Writes a small CSV with the given line ending: empty fields, a short row and
+# a blank line included
+def write_csv(path, newline = '\n', rows = 300):
+    lines = ['id,position,age,salary']
+    for i in range(rows):
+        salary = '' if i % 11 == 0 else str(1000 + i * 37 % 500)
+        lines.append(f"{i},{['PG', 'SG', 'C'][i % 3]},{20 + i % 7},{salary}")
+    lines[5] = '4,PG'
+    lines[7] = '6,Dončić,26,1500'
+    lines.insert(9, '')
+    with open(path, 'w', newline = '') as file:
+        file.write(newline.join(lines) + newline)
+    return str(path)
+
+
+# One frame holding the rows of all the frames an iterator produced
+def joined(frames):
+    frames = list(frames)
+    names = frames[0].column_names
+    return dataFrame({col: [v for f in frames for v in f.data[col]] for col in names}, list(names))
+
+
+def loaded(result):
+    data, column_names = result
+    return dataFrame(data, column_names)
+
+
+#////////////////////////  Loading  /////////////////////////////////////
+@pytest.mark.parametrize('newline', ['\n', '\r\n', '\r'])
+def test_parallel_load_matches_serial(tmp_path, newline):
+    path = write_csv(tmp_path / 'players.csv', newline)
+    serial = loaded(load_csv(path))
+    parallel = loaded(load_csv(path, workers = 2))
+    assert serial.shape == (300, 4)
+    assert parallel.column_names == serial.column_names
+    assert rows(parallel) == rows(serial)
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n', '\r'])
+def test_memory_mapped_load_matches_serial(tmp_path, newline):
+    path = write_csv(tmp_path / 'players.csv', newline)
+    serial = loaded(load_csv(path))
+    mapped = loaded(load_csv(path, memory_map = True))
+    assert mapped.column_names == serial.column_names == ['id', 'position', 'age', 'salary']
+    assert rows(mapped) == rows(serial)
+    assert loaded(load_csv(path, memory_map = True, columns = ['salary'])).data['salary'].to_list() == \
+        serial.data['salary'].to_list()
+
+
+# Encoded columns hold the same values; only low-cardinality ones are encoded
+def test_dictionary_encoded_load_matches_plain(tmp_path):
+    path = write_csv(tmp_path / 'players.csv')
+    with open(path, 'a') as file:
+        file.writelines(f"{i},P{i % 40},30,\n" for i in range(300, 600))
+    encoded = loaded(load_csv(path))
+    plain = loaded(load_csv(path, dictionary_encode = False))
+    assert encoded.data['position'].kind == 'dict' and plain.data['position'].kind == 'object'
+    assert rows(encoded) == rows(plain)
+    assert loaded(load_csv(path, columns = ['id', 'position'])).where({'position': 'P7'}).shape == (7, 2)
+
+    # Half the values distinct is too many to be worth encoding
+    with open(path, 'a') as file:
+        file.writelines(f"{i},Q{i},30,\n" for i in range(600, 1000))
+    assert loaded(load_csv(path)).data['position'].kind == 'object'
+
+
+# Zone-map pruning gives the rows a full scan does, however the frame was made
+def test_where_with_column_stats_matches_full_scan(tmp_path):
+    df = players(20000)
+    df.save_columnar(str(tmp_path / 'players.dfcol'))
+    condition = (col('id') >= 9000) & (col('id') < 12000) & (col('salary') > 1200)
+    expected = [row for row in rows(df) if 9000 <= row[0] < 12000 and row[3] is not None and row[3] > 1200]
+
+    for frame in (df, dataFrame.load_columnar(str(tmp_path / 'players.dfcol'))):
+        assert frame.data['id'].stats is None
+        assert rows(frame.where(condition)) == expected
+        assert frame.data['id'].stats is not None
+        assert rows(frame.where(condition)) == expected
+
+    # A write makes the stats stale; they are rebuilt for the next where
+    df.data['id'][5] = 10000
+    assert rows(df.where(col('id') == 10000)) == [row for row in rows(df) if row[0] == 10000]
+
+
+#////////////////////////  Lazy plans  /////////////////////////////////////
+@pytest.mark.parametrize('how', ['inner', 'left', 'right', 'outer'])
+def test_lazy_collect_matches_eager(how):
+    left, right = players(), contracts()
+    condition = (col('age') > 22) & (col('years') < 4)
+    eager = left.join(right, 'id', 'player_id', how).where(condition).select(['id', 'position', 'team'])
+    lazy = left.lazy().join(right, 'id', 'player_id', how).where(condition).select(['id', 'position', 'team'])
+    same_rows(lazy.collect(), eager)
+    same_rows(lazy.collect(optimize = False), eager)
+
+
+def test_scan_csv_matches_load_csv(tmp_path):
+    path = write_csv(tmp_path / 'players.csv')
+    eager = loaded(load_csv(path)).where(col('age') >= 24).select(['id', 'salary'])
+    same_rows(scan_csv(path).where(col('age') >= 24).select(['id', 'salary']).collect(), eager)
+
+
+#////////////////////////  Snapshots  /////////////////////////////////////
+def test_snapshot_round_trip(tmp_path):
+    df = loaded(load_csv(write_csv(tmp_path / 'players.csv')))
+    df = dataFrame(dict(df.data, points = players(300).data['points']), df.column_names + ['points'])
+    df.save_columnar(str(tmp_path / 'players.dfcol'))
+    loaded_back = dataFrame.load_columnar(str(tmp_path / 'players.dfcol'))
+    assert loaded_back.column_names == df.column_names
+    assert rows(loaded_back) == rows(df)
+    assert {col: loaded_back.data[col].kind for col in df.column_names} == \
+        {col: df.data[col].kind for col in df.column_names}
+
+
+def test_load_with_snapshot_matches_csv(tmp_path):
+    path = write_csv(tmp_path / 'players.csv', '\r\n')
+    first = load_with_snapshot(path)
+    assert os.path.exists(path + '.dfcol')
+    second = load_with_snapshot(path)
+    assert rows(first) == rows(second) == rows(loaded(load_csv(path)))
+
+
+# Evicted and oversized uploads come back from their snapshot, not the parser
+@pytest.mark.parametrize('max_bytes', [0, 1 << 30])
+def test_parse_cache_reloads_snapshots(tmp_path, monkeypatch, max_bytes):
+    parses = []
+    monkeypatch.setattr(Project, 'load_csv', lambda *args: parses.append(1) or load_csv(*args))
+    content = open(write_csv(tmp_path / 'players.csv'), 'rb').read()
+    cache = ParseCache(max_bytes, snapshot_dir = str(tmp_path))
+
+    first = cache.get_or_parse(content)
+    cache.clear()
+    again = cache.get_or_parse(content)
+    assert len(parses) == 1
+    assert rows(again) == rows(first)
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.dfcol')]) == 1
+
+
+#////////////////////////  Profiling  /////////////////////////////////////
+# profiling() covers only the calling thread and stops tracemalloc after
+def test_profiling_is_per_thread():
+    df = players()
+    other = []
+    thread = threading.Thread(target = lambda: other.append(df.sum('position', 'salary')))
+    with profiling():
+        profiled = df.sum('position', 'salary')
+        thread.start()
+        thread.join()
+    assert profiled._profile is not None and other[0]._profile is None
+    assert not tracemalloc.is_tracing()
+    assert df.sum('position', 'salary')._profile is None
+
+
+#////////////////////////  Joins  /////////////////////////////////////
+HOWS = ['inner', 'left', 'right', 'outer']
+
+
+@pytest.mark.parametrize('how', HOWS)
+def test_grace_join_matches_hash_join(how):
+    left, right = contracts(), players()
+    expected = left.join(right, 'player_id', 'id', how)
+    same_rows(left.join(right, 'player_id', 'id', how, memory_budget = 2048), expected)
+    same_rows(joined(iter_join(left, right, 'player_id', 'id', how, partitions = 5)), expected)
+
+
+@pytest.mark.parametrize('how', HOWS)
+def test_bloom_filter_join_matches_hash_join(how):
+    left, right = contracts(), players()
+    for a, b, a_key, b_key in [(left, right, 'player_id', 'id'), (right, left, 'id', 'player_id')]:
+        expected = a.join(b, a_key, b_key, how)
+        same_rows(a.join(b, a_key, b_key, how, bloom_filter = True), expected)
+        same_rows(a.join(b, a_key, b_key, how, memory_budget = 2048, bloom_filter = True), expected)
+        same_rows(joined(iter_join(a, b, a_key, b_key, how, partitions = 5, bloom_filter = True)), expected)
+
+
+# Semi/anti joins split the left rows by whether the inner join matched them
+@pytest.mark.parametrize('keys', [('player_id', 'id'), ('team', 'position')])
+def test_semi_and_anti_join_match_inner_join(keys):
+    left_key, right_key = keys
+    left = contracts()
+    right = dataFrame({'id': list(range(0, 200, 7)), 'position': [['GSW', 'PG', None][i % 3] for i in range(29)]},
+                      ['id', 'position'])
+    matched = set(left.join(right, left_key, right_key).data[left_key])
+    key = left.column_names.index(left_key)
+    assert rows(left.semi_join(right, left_key, right_key)) == [row for row in rows(left) if row[key] in matched]
+    assert rows(left.anti_join(right, left_key, right_key)) == [row for row in rows(left) if row[key] not in matched]
+
+
+@pytest.mark.parametrize('how', HOWS)
+def test_grace_join_of_csv_files_matches_hash_join(tmp_path, how):
+    path = write_csv(tmp_path / 'players.csv')
+    left, right = contracts(), loaded(load_csv(path))
+    expected = left.join(right, 'player_id', 'id', how)
+    same_rows(joined(iter_join(left, path, 'player_id', 'id', how, chunk_rows = 40)), expected)
+
+
+#////////////////////////  order_by  /////////////////////////////////////
+# Plain sorted() reference: nulls last in either direction
+def sorted_rows(df, columns, ascending):
+    result = rows(df)
+    for col, up in reversed(list(zip(columns, ascending))):
+        k = df.column_names.index(col)
+        if up:
+            result.sort(key = lambda row: (row[k] is None, 0 if row[k] is None else row[k]))
+        else:
+            result.sort(key = lambda row: (row[k] is not None, 0 if row[k] is None else row[k]), reverse = True)
+    return result
+
+
+@pytest.mark.parametrize('limit', [None, 0, 7, 1000])
+@pytest.mark.parametrize('memory_budget', [None, 512])
+def test_order_by_matches_sorted(limit, memory_budget):
+    df = players(500)
+    columns, ascending = ['position', 'salary', 'id'], [True, False, True]
+    kwargs = {} if memory_budget is None else {'memory_budget': memory_budget}
+    result = df.order_by(columns, ascending, limit = limit, **kwargs)
+    expected = sorted_rows(df, columns, ascending)
+    assert rows(result) == (expected if limit is None else expected[:limit])
+
+
+#////////////////////////  agg  /////////////////////////////////////
+def test_agg_matches_single_aggregates():
+    df = players()
+    result = df.agg(['position', 'age'], {'salary': ['sum', 'max'], 'points': ['avg']})
+    same_rows(result.select(['position', 'age', 'salary_sum']), df.sum(['position', 'age'], 'salary'))
+    same_rows(result.select(['position', 'age', 'salary_max']), df.max(['position', 'age'], 'salary'))
+    same_rows(result.select(['position', 'age', 'points_avg']), df.avg(['position', 'age'], 'points'))
+
+
+AGGS = {'salary': ['sum', 'avg', 'max', 'min', 'count'], 'points': ['avg'], '*': ['count']}
+
+
+@pytest.mark.parametrize('by', ['position', 'id', ['position', 'age']])
+def test_spilled_agg_matches_in_memory(by):
+    df = players(2000)
+    same_rows(df.agg(by, AGGS, memory_budget = 4096), df.agg(by, AGGS))
+
+
+@pytest.mark.parametrize('by', ['position', ['position', 'age']])
+def test_parallel_agg_matches_serial(by):
+    df = players(3000)
+    parallel = df.agg(by, AGGS, workers = 2)
+    serial = df.agg(by, AGGS)
+    assert parallel.column_names == serial.column_names
+    # Partial sums are added in another order, so floats may differ in the last bits
+    width = 1 if isinstance(by, str) else len(by)
+    expected = {row[:width]: row for row in rows(serial)}
+    assert len(rows(parallel)) == len(expected)
+    for row in rows(parallel):
+        assert row == pytest.approx(expected[row[:width]])
+
+
+def test_agg_needs_group_column():
+    with pytest.raises(ValueError):
+        players().agg([], {'salary': ['sum']})
+
+
+def test_agg_rejects_repeated_function():
+    with pytest.raises(ValueError):
+        players().agg('position', {'salary': ['sum', 'sum']})
+
+
+#////////////////////////  Approximate aggregates  /////////////////////////////////////
+# A sample that covers every row gives the exact answer with no spread
+@pytest.mark.parametrize('by', ['position', ['position', 'age']])
+def test_approx_aggregates_match_exact_on_full_sample(by):
+    df = players(500)
+    for approx, exact, name in [(df.approx_avg, df.avg, 'salary_avg'), (df.approx_sum, df.sum, 'salary_sum')]:
+        result = approx(by, 'salary', sample_rows = df.shape[0])
+        keys = [by] if isinstance(by, str) else by
+        same_rows(result.select(keys + [name]), exact(by, 'salary'))
+        assert list(result.data[name + '_low']) == list(result.data[name + '_high']) == list(result.data[name])
+
+
+def test_approx_count_distinct_is_close():
+    df = dataFrame({'k': [i % 3000 for i in range(20000)]})
+    assert abs(df.approx_count_distinct('k') - 3000) < 3000 * 0.05